@@ -10,6 +10,17 @@ class Settings(BaseSettings):
     openrouter_api_key: str
     debug: bool = False
     resend_api_key: str = ""
+    db_max_workers: int = 16
+    # Above this many new articles per user in one batch, notifications are grouped per sector
+    notification_coalesce_threshold: int = 3
+    # Per-client send queue for /market/ws, and what to do when it fills:
+    # drop_oldest, conflate (latest trade per symbol) or disconnect
+    market_ws_queue_size: int = 100
+    market_ws_overflow_policy: str = "drop_oldest"
+    # Upper bound on the flush rate a client may request in conflation mode
+    market_ws_max_flush_hz: float = 10.0
+    # Keep the upstream Finnhub connection this long after the last client leaves
+    market_ws_idle_grace_seconds: float = 60.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import TypedDict
+
+from app.db import supabase as db
+
+REFERENCE_TTL_SECONDS = 15 * 60
+
+
+class SectorRow(TypedDict):
+    id: int
+    name: str
+    category: str
+    slug: str
+
+
+class StockRow(TypedDict):
+    ticker: str
+    name: str
+
+
+class ReferenceData:
+    """In-process cache of the `sectors` and active `stock_pool` tables.
+
+    Both tables almost never change, so they are loaded once (at startup or on
+    first use), reloaded when older than the TTL, and dropped with invalidate()
+    after an edit.
+    """
+
+    def __init__(self, ttl_seconds: float = REFERENCE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sectors: list[SectorRow] = []
+        self._sectors_by_id: dict[int, SectorRow] = {}
+        self._sectors_by_slug: dict[str, SectorRow] = {}
+        self._sectors_by_category: dict[str, list[SectorRow]] = {}
+        self._stocks: list[StockRow] = []
+        self._stocks_by_ticker: dict[str, StockRow] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def refresh(self):
+        """Reload both tables and rebuild the indexes."""
+        sectors, stocks = await asyncio.gather(db.fetch_sectors(), db.fetch_active_stock_pool())
+
+        by_category: dict[str, list[SectorRow]] = {}
+        for s in sectors:
+            by_category.setdefault(s["category"], []).append(s)
+
+        self._sectors = sectors
+        self._sectors_by_id = {s["id"]: s for s in sectors}
+        self._sectors_by_slug = {s["slug"]: s for s in sectors}
+        self._sectors_by_category = by_category
+        self._stocks = stocks
+        self._stocks_by_ticker = {s["ticker"]: s for s in stocks}
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force the next read to reload from the database."""
+        self._loaded_at = None
+
+    async def _ensure_fresh(self):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Serve stale data rather than failing reads; retry on the next call
+                if not self._sectors:
+                    raise
+                print(f"[reference_data] refresh failed, serving stale data: {e}")
+
+    async def sectors(self) -> list[SectorRow]:
+        await self._ensure_fresh()
+        return list(self._sectors)
+
+    async def sector_by_id(self, sector_id: int) -> SectorRow | None:
+        await self._ensure_fresh()
+        return self._sectors_by_id.get(sector_id)
+
+    async def sector_by_slug(self, slug: str) -> SectorRow | None:
+        await self._ensure_fresh()
+        return self._sectors_by_slug.get(slug)
+
+    async def sectors_in_category(self, category: str) -> list[SectorRow]:
+        await self._ensure_fresh()
+        return list(self._sectors_by_category.get(category, []))
+
+    async def sector_map(self) -> dict[int, SectorRow]:
+        await self._ensure_fresh()
+        return dict(self._sectors_by_id)
+
+    async def stock_pool(self) -> list[StockRow]:
+        await self._ensure_fresh()
+        return list(self._stocks)
+
+    async def stock_by_ticker(self, ticker: str) -> StockRow | None:
+        await self._ensure_fresh()
+        return self._stocks_by_ticker.get(ticker)
+
+
+reference_data = ReferenceData()
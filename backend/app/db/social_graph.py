@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+
+from app.db import supabase as db
+
+GRAPH_TTL_SECONDS = 10 * 60
+GRAPH_MAX_ENTRIES = 50_000
+
+
+class SocialGraph:
+    """In-process adjacency lists of accepted friendships, keyed by user id.
+
+    A user's friend set is loaded from the database on first read and then
+    kept current by the friendship write functions in app.db.supabase, which
+    pass the written row to apply(). Only users already in the cache are
+    updated (the next read loads the rest), and entries are reloaded after
+    the TTL as a safety net against writes made by other instances.
+    """
+
+    def __init__(self, ttl_seconds: float = GRAPH_TTL_SECONDS, max_entries: int = GRAPH_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._friends: OrderedDict[str, tuple[set[str], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def friends(self, user_id: str) -> set[str]:
+        cached = self._friends.get(user_id)
+        if cached and time.monotonic() - cached[1] < self.ttl_seconds:
+            self._friends.move_to_end(user_id)
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        friend_ids = set(await db.fetch_friend_ids(user_id))
+        self._store(user_id, friend_ids, time.monotonic())
+        return friend_ids
+
+    def _store(self, user_id: str, friend_ids: set[str], loaded_at: float):
+        self._friends[user_id] = (friend_ids, loaded_at)
+        self._friends.move_to_end(user_id)
+        if len(self._friends) > self.max_entries:
+            self._friends.popitem(last=False)
+
+    def apply(self, row: dict, deleted: bool = False):
+        """Write through a friendships row: an accepted row is an edge, anything else is not."""
+        a, b = row["requester_id"], row["addressee_id"]
+        connected = not deleted and row.get("status") == "accepted"
+        for user_id, other in ((a, b), (b, a)):
+            cached = self._friends.get(user_id)
+            if not cached:
+                continue
+            if connected:
+                cached[0].add(other)
+            else:
+                cached[0].discard(other)
+
+    def clear(self):
+        self._friends.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._friends),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+social_graph = SocialGraph()
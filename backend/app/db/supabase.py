@@ -1,108 +1,262 @@
-from datetime import datetime, timedelta
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
+from app.config import settings
 from app.dependencies import supabase
 
+# supabase-py's client is synchronous, so every request runs on this bounded
+# worker pool instead of the event loop. Workers share the client's pooled
+# httpx session, so concurrency is capped here rather than by open sockets.
+_db_executor = ThreadPoolExecutor(max_workers=settings.db_max_workers, thread_name_prefix="db")
+
+
+async def execute(query):
+    """Run a PostgREST query or RPC builder off the event loop and return its response."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, query.execute)
+
+
+# --- Pagination ---
+# List endpoints page by keyset on (sort column, id) so deep pages cost the
+# same as the first one. Cursors are opaque to clients; `page` still works
+# (as an offset) when no cursor is given. Totals are only counted on request.
+
+def encode_cursor(sort_value, row_id) -> str:
+    raw = f"{sort_value or ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str | None, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, _, row_id = raw.rpartition("|")
+        return value or None, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def next_cursor(rows: list[dict], limit: int, column: str) -> str | None:
+    """Cursor for the page after `rows`, or None if this was the last page."""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].get(column), rows[-1]["id"])
+
+
+def _paginate(query, column: str, limit: int, page: int = 1, cursor: str | None = None):
+    """Order by (column DESC NULLS FIRST, id DESC) and apply either the cursor or the page offset."""
+    query = query.order(column, desc=True, nullsfirst=True).order("id", desc=True)
+    if cursor:
+        value, row_id = _decode_cursor(cursor)
+        if value is None:
+            query = query.or_(f"and({column}.is.null,id.lt.{row_id}),{column}.not.is.null")
+        else:
+            query = query.or_(f'{column}.lt."{value}",and({column}.eq."{value}",id.lt.{row_id})')
+        return query.limit(limit)
+    offset = (page - 1) * limit
+    return query.range(offset, offset + limit - 1)
+
 
 # --- Articles ---
 
+# Named projections for article reads. List endpoints ship only what
+# ArticleCard/HeroCard render; raw_content and lesson_data stay on the detail read.
+ARTICLE_CARD = (
+    "id, headline, snippet, source_name, image_url, published_at, "
+    "article_sectors(sector_id, sectors(name, slug, category))"
+)
+ARTICLE_DETAIL = (
+    "id, finnhub_id, gnews_url, source_name, headline, snippet, original_url, image_url, author, "
+    "published_at, language, ai_summary, ai_tutorial, lesson_data, processing_status, created_at, "
+    "updated_at, article_sectors(sector_id, sectors(name, slug)), article_tickers(*)"
+)
+# What the processing pipeline needs to scrape and generate a lesson
+ARTICLE_PIPELINE = (
+    "id, headline, snippet, original_url, image_url, raw_content, article_sectors(sector_id)"
+)
+# What recover_stuck_articles needs to decide whether to retry
+ARTICLE_STATUS = "id, retry_count, created_at, updated_at"
+
+
 async def get_articles(
     sector: str | None = None,
     category: str | None = None,
     page: int = 1,
     limit: int = 20,
     status: str | None = None,
+    cursor: str | None = None,
+    count: str | None = None,
+    columns: str = ARTICLE_CARD,
 ):
-    query = supabase.table("articles").select(
-        "*, article_sectors(sector_id, sectors(name, slug, category))",
-        count="exact",
-    )
+    """Return (articles, total). `count` is None, "exact" or "estimated"; total is None when not counted.
+
+    Sector/category filters run in the same query through a second, inner-joined
+    embed of article_sectors, so the returned article_sectors list stays complete.
+    """
+    from app.db.reference import reference_data
+
+    sector_ids = None
+    if sector:
+        row = await reference_data.sector_by_slug(sector)
+        sector_ids = [row["id"]] if row else []
+    elif category:
+        sector_ids = [s["id"] for s in await reference_data.sectors_in_category(category)]
+    if sector_ids is not None:
+        if not sector_ids:
+            return [], 0
+        columns += ", sector_filter:article_sectors!inner(sector_id)"
+    query = supabase.table("articles").select(columns, count=count)
 
     if status:
         query = query.eq("processing_status", status)
     else:
         query = query.eq("processing_status", "done")
 
-    if sector:
-        sector_row = supabase.table("sectors").select("id").eq("slug", sector).single().execute()
-        if sector_row.data:
-            article_ids = supabase.table("article_sectors").select("article_id").eq("sector_id", sector_row.data["id"]).execute()
-            ids = [r["article_id"] for r in article_ids.data]
-            if ids:
-                query = query.in_("id", ids)
-            else:
-                return [], 0
-    elif category:
-        sector_rows = supabase.table("sectors").select("id").eq("category", category).execute()
-        sector_ids = [r["id"] for r in sector_rows.data]
-        article_ids = supabase.table("article_sectors").select("article_id").in_("sector_id", sector_ids).execute()
-        ids = list(set(r["article_id"] for r in article_ids.data))
-        if ids:
-            query = query.in_("id", ids)
-        else:
-            return [], 0
+    if sector_ids is not None:
+        query = query.in_("sector_filter.sector_id", sector_ids)
 
-    offset = (page - 1) * limit
-    result = query.order("published_at", desc=True).range(offset, offset + limit - 1).execute()
+    result = await execute(_paginate(query, "published_at", limit, page, cursor))
+    for row in result.data:
+        row.pop("sector_filter", None)
     return result.data, result.count
 
 
 async def get_article_by_id(article_id: int):
-    result = supabase.table("articles").select(
-        "id, finnhub_id, gnews_url, source_name, headline, snippet, original_url, image_url, author, published_at, language, ai_summary, ai_tutorial, lesson_data, processing_status, created_at, updated_at, article_sectors(sector_id, sectors(name, slug)), article_tickers(*)"
-    ).eq("id", article_id).single().execute()
+    result = await execute(supabase.table("articles").select(ARTICLE_DETAIL).eq("id", article_id).single())
     return result.data
 
 
-async def insert_article(data: dict) -> int:
-    result = supabase.table("articles").insert(data).execute()
-    return result.data[0]["id"]
+async def insert_articles(rows: list[dict]) -> tuple[list[dict], list[int]]:
+    """Insert a batch of articles in one request. Returns the inserted rows and their new IDs, in order.
+
+    If the batch fails (e.g. a row slipped past dedup and hits one of the
+    UNIQUE finnhub_id/gnews_url/original_url constraints), the rows are
+    retried one by one and the ones that still fail are skipped, so a single
+    duplicate can't block the whole cycle.
+    """
+    if not rows:
+        return [], []
+    try:
+        result = await execute(supabase.table("articles").insert(rows))
+        return rows, [r["id"] for r in result.data]
+    except Exception as e:
+        print(f"[db] bulk article insert failed, retrying per row: {e}")
+
+    inserted, ids = [], []
+    for row in rows:
+        try:
+            result = await execute(supabase.table("articles").insert(row))
+        except Exception as e:
+            print(f"[db] skipping article {row.get('original_url')}: {e}")
+            continue
+        inserted.append(row)
+        ids.append(result.data[0]["id"])
+    return inserted, ids
 
 
 async def update_article(article_id: int, data: dict):
-    supabase.table("articles").update(data).eq("id", article_id).execute()
+    await execute(supabase.table("articles").update(data).eq("id", article_id))
+
+
+# Columns that identify an already-ingested article, and how many values go
+# into a single in_() filter so the request URL stays well under server limits.
+_DEDUP_KEYS = ("finnhub_id", "gnews_url", "original_url")
+_DEDUP_CHUNK_SIZE = 100
+
+
+async def filter_new_articles(candidates: list[dict]) -> list[dict]:
+    """Drop candidates that are already stored or repeated earlier in the batch.
+
+    Existence is resolved with one in_() query per dedup column (chunked, run
+    concurrently) instead of up to three lookups per candidate.
+    """
+    seen: dict[str, set] = {key: set() for key in _DEDUP_KEYS}
+    unique = []
+    for candidate in candidates:
+        keys = [(k, candidate[k]) for k in _DEDUP_KEYS if candidate.get(k)]
+        if any(v in seen[k] for k, v in keys):
+            continue
+        for k, v in keys:
+            seen[k].add(v)
+        unique.append(candidate)
+
+    lookups = []
+    for key, values in seen.items():
+        values = list(values)
+        for i in range(0, len(values), _DEDUP_CHUNK_SIZE):
+            chunk = values[i:i + _DEDUP_CHUNK_SIZE]
+            lookups.append((key, supabase.table("articles").select(key).in_(key, chunk)))
+
+    results = await asyncio.gather(*(execute(q) for _, q in lookups))
+    existing: dict[str, set] = {key: set() for key in _DEDUP_KEYS}
+    for (key, _), result in zip(lookups, results):
+        existing[key].update(r[key] for r in result.data)
+
+    return [
+        c for c in unique
+        if not any(c.get(k) and c[k] in existing[k] for k in _DEDUP_KEYS)
+    ]
 
 
-async def article_exists(finnhub_id: str | None = None, gnews_url: str | None = None, original_url: str | None = None) -> bool:
-    if finnhub_id:
-        result = supabase.table("articles").select("id").eq("finnhub_id", finnhub_id).execute()
-        if result.data:
-            return True
-    if gnews_url:
-        result = supabase.table("articles").select("id").eq("gnews_url", gnews_url).execute()
-        if result.data:
-            return True
-    if original_url:
-        result = supabase.table("articles").select("id").eq("original_url", original_url).execute()
-        if result.data:
-            return True
-    return False
+async def iter_recent_article_keys(since: str, page_size: int = 1000):
+    """Yield pages of dedup keys for articles published since `since`, keyset-paginated by id."""
+    last_id = 0
+    while True:
+        result = await execute(
+            supabase.table("articles")
+            .select("id, " + ", ".join(_DEDUP_KEYS))
+            .gte("published_at", since)
+            .gt("id", last_id)
+            .order("id")
+            .limit(page_size)
+        )
+        if not result.data:
+            return
+        yield result.data
+        if len(result.data) < page_size:
+            return
+        last_id = result.data[-1]["id"]
 
 
 async def insert_article_sectors(article_id: int, sector_ids: list[int]):
     rows = [{"article_id": article_id, "sector_id": sid} for sid in sector_ids]
-    supabase.table("article_sectors").insert(rows).execute()
+    await execute(supabase.table("article_sectors").insert(rows))
 
 
 async def insert_article_tickers(article_id: int, tickers: list[dict]):
     rows = [{"article_id": article_id, **t} for t in tickers]
-    supabase.table("article_tickers").insert(rows).execute()
+    await execute(supabase.table("article_tickers").insert(rows))
+
+
+async def insert_article_sector_rows(rows: list[dict]):
+    """Bulk insert {article_id, sector_id} rows spanning many articles."""
+    if rows:
+        await execute(supabase.table("article_sectors").insert(rows))
+
+
+async def insert_article_ticker_rows(rows: list[dict]):
+    """Bulk insert {article_id, ticker, price, price_change_pct} rows spanning many articles."""
+    if rows:
+        await execute(supabase.table("article_tickers").insert(rows))
 
 
 async def get_articles_by_sector_ids(
     sector_ids: list[int],
     page: int = 1,
     limit: int = 20,
+    cursor: str | None = None,
+    count: str | None = None,
 ):
-    offset = (page - 1) * limit
-    result = (
+    query = (
         supabase.table("articles")
-        .select("*, article_sectors!inner(sector_id, sectors(name, slug, category))", count="exact")
+        .select(ARTICLE_CARD + ", sector_filter:article_sectors!inner(sector_id)", count=count)
         .eq("processing_status", "done")
-        .in_("article_sectors.sector_id", sector_ids)
-        .order("published_at", desc=True)
-        .range(offset, offset + limit - 1)
-        .execute()
+        .in_("sector_filter.sector_id", sector_ids)
     )
+    result = await execute(_paginate(query, "published_at", limit, page, cursor))
+    for row in result.data:
+        row.pop("sector_filter", None)
     return result.data, result.count
 
 
@@ -110,10 +264,10 @@ async def get_articles_by_sector_ids(
 
 async def insert_quiz(article_id: int, questions: list[dict]) -> int:
     # Check if quiz already exists (UNIQUE constraint on article_id)
-    existing = supabase.table("quizzes").select("id").eq("article_id", article_id).execute()
+    existing = await execute(supabase.table("quizzes").select("id").eq("article_id", article_id))
     if existing.data:
         return existing.data[0]["id"]
-    quiz = supabase.table("quizzes").insert({"article_id": article_id}).execute()
+    quiz = await execute(supabase.table("quizzes").insert({"article_id": article_id}))
     quiz_id = quiz.data[0]["id"]
     rows = [
         {
@@ -127,195 +281,328 @@ async def insert_quiz(article_id: int, questions: list[dict]) -> int:
         }
         for i, q in enumerate(questions)
     ]
-    supabase.table("quiz_questions").insert(rows).execute()
+    await execute(supabase.table("quiz_questions").insert(rows))
     return quiz_id
 
 
 async def get_quiz_by_article(article_id: int):
-    result = supabase.table("quizzes").select(
+    result = await execute(supabase.table("quizzes").select(
         "*, quiz_questions(*)"
-    ).eq("article_id", article_id).single().execute()
+    ).eq("article_id", article_id).single())
     return result.data
 
 
-async def get_quiz_attempt(user_id: str, quiz_id: int):
-    result = supabase.table("quiz_attempts").select("*").eq("user_id", user_id).eq("quiz_id", quiz_id).execute()
-    return result.data[0] if result.data else None
-
-
-async def insert_quiz_attempt(user_id: str, quiz_id: int, score: int, total: int, xp: int, user_answers: list[int] | None = None):
-    row = {
-        "user_id": user_id,
-        "quiz_id": quiz_id,
-        "score": score,
-        "total_questions": total,
-        "xp_earned": xp,
-    }
-    if user_answers is not None:
-        row["user_answers"] = user_answers
-    supabase.table("quiz_attempts").insert(row).execute()
+async def submit_quiz_attempt(
+    user_id: str,
+    quiz_id: int,
+    article_id: int,
+    score: int,
+    total: int,
+    user_answers: list[int],
+    gauge_gain: int,
+) -> dict:
+    """Record a graded quiz and apply its XP, gauge and milestone side effects atomically.
+
+    Returns {"already_completed": true} if the user has already taken the quiz,
+    otherwise xp_earned, gauge_updates ({sector_id: score}), milestones,
+    streak_days and the article's sector_ids.
+    """
+    result = await execute(supabase.rpc("submit_quiz_attempt", {
+        "uid": user_id,
+        "p_quiz_id": quiz_id,
+        "p_article_id": article_id,
+        "p_score": score,
+        "p_total": total,
+        "p_answers": user_answers,
+        "p_gauge_gain": gauge_gain,
+    }))
+    return result.data
 
 
 # --- Profiles ---
 
 async def get_profile(user_id: str):
-    result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
+    result = await execute(supabase.table("profiles").select("*").eq("id", user_id).single())
     return result.data
 
 
 async def update_profile(user_id: str, data: dict):
-    supabase.table("profiles").update(data).eq("id", user_id).execute()
+    await execute(supabase.table("profiles").update(data).eq("id", user_id))
 
 
-async def add_xp(user_id: str, amount: int):
-    supabase.rpc("increment_xp", {"uid": user_id, "amount": amount}).execute()
+_XP_GRANT_CHUNK_SIZE = 1000
+
+
+async def grant_xp(grants: dict[str, int], grant_key: str) -> dict[str, int]:
+    """Add XP to many users at once via the grant_xp RPC. Returns the grants applied.
+
+    grant_key makes the call idempotent: replaying a key (e.g. a retried
+    scheduler tick) grants nothing. Large batches are split into chunks keyed
+    "<grant_key>:<n>", cut in user_id order so a replay rebuilds the same
+    chunks whatever order the caller's dict (often built from a set) is in.
+    """
+    rows = [
+        {"user_id": uid, "amount": amount}
+        for uid, amount in sorted(grants.items()) if amount > 0
+    ]
+    if not rows:
+        return {}
+    chunks = [rows[i:i + _XP_GRANT_CHUNK_SIZE] for i in range(0, len(rows), _XP_GRANT_CHUNK_SIZE)]
+    keys = [grant_key] if len(chunks) == 1 else [f"{grant_key}:{n}" for n in range(len(chunks))]
+    results = await asyncio.gather(*(
+        execute(supabase.rpc("grant_xp", {"grants": chunk, "p_grant_key": key}))
+        for chunk, key in zip(chunks, keys)
+    ))
+    return {
+        row["user_id"]: row["amount"]
+        for chunk, result in zip(chunks, results) if result.data
+        for row in chunk
+    }
 
 
 # --- Favorites ---
 
 async def get_user_favorites(user_id: str):
-    result = supabase.table("user_favorites").select(
+    result = await execute(supabase.table("user_favorites").select(
         "*, sectors(name, slug, category)"
-    ).eq("user_id", user_id).execute()
+    ).eq("user_id", user_id))
     return result.data
 
 
 async def add_favorite(user_id: str, sector_id: int):
-    supabase.table("user_favorites").insert({
+    await execute(supabase.table("user_favorites").insert({
         "user_id": user_id,
         "sector_id": sector_id,
         "gauge_score": 50,
-    }).execute()
+    }))
 
 
 async def remove_favorite(user_id: str, sector_id: int):
-    supabase.table("user_favorites").delete().eq("user_id", user_id).eq("sector_id", sector_id).execute()
-
-
-async def update_gauge(user_id: str, sector_id: int, new_score: int):
-    clamped = max(0, min(100, new_score))
-    supabase.table("user_favorites").update({
-        "gauge_score": clamped,
-        "gauge_updated_at": datetime.utcnow().isoformat(),
-    }).eq("user_id", user_id).eq("sector_id", sector_id).execute()
+    await execute(supabase.table("user_favorites").delete().eq("user_id", user_id).eq("sector_id", sector_id))
 
 
 async def get_all_favorites_with_users():
-    result = supabase.table("user_favorites").select("*").execute()
-    return result.data
+    """Every favorite with its gauge columns (paged past the max-rows limit)."""
+    return await _fetch_favorites("*")
+
+
+_GAUGE_CHUNK_SIZE = 500
+_QUIZ_ID_CHUNK_SIZE = 100
+
+
+async def update_gauges(rows: list[dict]):
+    """Bulk write {user_id, sector_id, gauge_score} rows via the apply_gauge_updates RPC.
+
+    Unlike an upsert, favorites removed in the meantime are not recreated.
+    """
+    rows = [{**r, "gauge_score": max(0, min(100, r["gauge_score"]))} for r in rows]
+    chunks = [rows[i:i + _GAUGE_CHUNK_SIZE] for i in range(0, len(rows), _GAUGE_CHUNK_SIZE)]
+    await asyncio.gather(*(execute(supabase.rpc("apply_gauge_updates", {"updates": c})) for c in chunks))
+
+
+async def get_done_articles_with_quizzes(created_after: str, created_before: str, page_size: int = 1000):
+    """Done articles created in the window, with their sector ids and quiz ids."""
+    rows, last_id = [], 0
+    while True:
+        result = await execute(
+            supabase.table("articles")
+            .select("id, article_sectors(sector_id), quizzes(id)")
+            .eq("processing_status", "done")
+            .gt("created_at", created_after)
+            .lt("created_at", created_before)
+            .gt("id", last_id)
+            .order("id")
+            .limit(page_size)
+        )
+        rows += result.data
+        if len(result.data) < page_size:
+            return rows
+        last_id = result.data[-1]["id"]
+
+
+async def get_quiz_attempt_pairs(quiz_ids: list[int], page_size: int = 1000) -> list[dict]:
+    """All (user_id, quiz_id) attempts on the given quizzes."""
+
+    async def fetch_chunk(chunk: list[int]) -> list[dict]:
+        rows, last_id = [], 0
+        while True:
+            result = await execute(
+                supabase.table("quiz_attempts")
+                .select("id, user_id, quiz_id")
+                .in_("quiz_id", chunk)
+                .gt("id", last_id)
+                .order("id")
+                .limit(page_size)
+            )
+            rows += result.data
+            if len(result.data) < page_size:
+                return rows
+            last_id = result.data[-1]["id"]
+
+    chunks = [quiz_ids[i:i + _QUIZ_ID_CHUNK_SIZE] for i in range(0, len(quiz_ids), _QUIZ_ID_CHUNK_SIZE)]
+    results = await asyncio.gather(*(fetch_chunk(c) for c in chunks))
+    return [row for rows in results for row in rows]
+
+
+async def _fetch_favorites(columns: str, page_size: int = 1000) -> list[dict]:
+    """Every user_favorites row, keyset-paginated on the unique (user_id, sector_id) key."""
+    rows: list[dict] = []
+    while True:
+        query = supabase.table("user_favorites").select(columns).order("user_id").order("sector_id")
+        if rows:
+            last = rows[-1]
+            query = query.or_(
+                f"user_id.gt.{last['user_id']},"
+                f"and(user_id.eq.{last['user_id']},sector_id.gt.{last['sector_id']})"
+            )
+        result = await execute(query.limit(page_size))
+        rows += result.data
+        if len(result.data) < page_size:
+            return rows
+
+
+async def get_favorite_pairs():
+    """All (user_id, sector_id) favorite pairs, without gauge columns."""
+    return await _fetch_favorites("user_id, sector_id")
 
 
 # --- Notifications ---
 
-async def insert_notification(user_id: str, type: str, title: str, body: str, link: str | None = None):
-    supabase.table("notifications").insert({
+async def insert_notification(user_id: str, type: str, title: str, body: str, link: str | None = None) -> dict:
+    result = await execute(supabase.table("notifications").insert({
         "user_id": user_id,
         "type": type,
         "title": title,
         "body": body,
         "link": link,
-    }).execute()
+    }))
+    from app.db.unread_counts import unread_counts
+    unread_counts.adjust(user_id, 1)
+    return result.data[0]
 
 
-async def get_notifications(user_id: str, page: int = 1, limit: int = 20):
-    offset = (page - 1) * limit
-    result = supabase.table("notifications").select("*", count="exact").eq(
-        "user_id", user_id
-    ).order("created_at", desc=True).range(offset, offset + limit - 1).execute()
+_NOTIFICATION_CHUNK_SIZE = 500
+
+
+async def insert_notifications(rows: list[dict]) -> list[dict]:
+    """Bulk insert notification rows, chunked so each request stays small. Returns the stored rows."""
+    chunks = [rows[i:i + _NOTIFICATION_CHUNK_SIZE] for i in range(0, len(rows), _NOTIFICATION_CHUNK_SIZE)]
+    results = await asyncio.gather(*(execute(supabase.table("notifications").insert(c)) for c in chunks))
+    stored = [row for result in results for row in result.data]
+
+    from app.db.unread_counts import unread_counts
+    for row in stored:
+        if not row.get("read"):
+            unread_counts.adjust(row["user_id"], 1)
+    return stored
+
+
+async def count_unread_notifications(user_id: str) -> int:
+    result = await execute(supabase.table("notifications").select(
+        "id", count="exact", head=True
+    ).eq("user_id", user_id).eq("read", False))
+    return result.count or 0
+
+
+async def get_notifications(
+    user_id: str,
+    page: int = 1,
+    limit: int = 20,
+    cursor: str | None = None,
+    count: str | None = None,
+):
+    query = supabase.table("notifications").select("*", count=count).eq("user_id", user_id)
+    result = await execute(_paginate(query, "created_at", limit, page, cursor))
     return result.data, result.count
 
 
 async def mark_notification_read(notification_id: int, user_id: str):
-    supabase.table("notifications").update({"read": True}).eq("id", notification_id).eq("user_id", user_id).execute()
+    result = await execute(supabase.table("notifications").update({"read": True}).eq(
+        "id", notification_id
+    ).eq("user_id", user_id).eq("read", False))
+    from app.db.unread_counts import unread_counts
+    unread_counts.adjust(user_id, -len(result.data or []))
 
 
 async def mark_all_notifications_read(user_id: str):
-    supabase.table("notifications").update({"read": True}).eq("user_id", user_id).eq("read", False).execute()
+    await execute(supabase.table("notifications").update({"read": True}).eq("user_id", user_id).eq("read", False))
+    from app.db.unread_counts import unread_counts
+    unread_counts.reset(user_id)
 
 
 async def delete_all_notifications(user_id: str):
-    supabase.table("notifications").delete().eq("user_id", user_id).execute()
+    await execute(supabase.table("notifications").delete().eq("user_id", user_id))
+    from app.db.unread_counts import unread_counts
+    unread_counts.reset(user_id)
 
 
 async def delete_notification(notification_id: int, user_id: str):
-    supabase.table("notifications").delete().eq("id", notification_id).eq("user_id", user_id).execute()
+    result = await execute(supabase.table("notifications").delete().eq("id", notification_id).eq("user_id", user_id))
+    from app.db.unread_counts import unread_counts
+    unread_counts.adjust(user_id, -sum(1 for r in (result.data or []) if not r.get("read")))
 
 
 # --- Leaderboard ---
 
 async def get_global_leaderboard(period: str = "all_time") -> list[dict]:
     if period == "weekly":
-        result = supabase.table("leaderboard_weekly").select("*").order("rank").limit(20).execute()
+        result = await execute(supabase.table("leaderboard_weekly").select("*").order("rank").limit(20))
     elif period == "monthly":
-        result = supabase.table("leaderboard_monthly").select("*").order("rank").limit(20).execute()
+        result = await execute(supabase.table("leaderboard_monthly").select("*").order("rank").limit(20))
     else:
-        result = supabase.table("leaderboard_global").select("*").order("rank").limit(20).execute()
+        result = await execute(supabase.table("leaderboard_global").select("*").order("rank").limit(20))
     return result.data
 
 
 async def get_sector_leaderboard(sector_id: int, period: str = "all_time") -> list[dict]:
-    result = supabase.table("leaderboard_sector").select("*").eq("sector_id", sector_id).order("rank").limit(20).execute()
+    result = await execute(supabase.table("leaderboard_sector").select("*").eq("sector_id", sector_id).order("rank").limit(20))
     return result.data
 
 
-async def get_user_rank(user_id: str):
-    result = supabase.table("leaderboard_global").select("*").eq("user_id", user_id).execute()
-    return result.data[0] if result.data else None
-
-
-async def get_users_fav_sectors(user_ids: list[str]) -> dict[str, dict]:
-    """Return each user's top sector by XP and what % of their quiz XP it represents."""
-    if not user_ids:
-        return {}
-    # Query sector breakdown from materialized view
-    result = (
-        supabase.table("leaderboard_sector")
-        .select("user_id, sector_id, sector_xp")
-        .in_("user_id", user_ids)
-        .execute()
-    )
-    if not result.data:
-        return {}
+async def fetch_leaderboard_view(
+    view: str, columns: str, order: tuple[str, ...] = ("user_id",), page_size: int = 1000,
+) -> list[dict]:
+    """Every row of a leaderboard materialized view, paged by offset.
+
+    `order` must be a unique key of the view, or page boundaries can skip or
+    repeat rows.
+    """
+    rows, offset = [], 0
+    while True:
+        query = supabase.table(view).select(columns)
+        for column in order:
+            query = query.order(column)
+        result = await execute(query.range(offset, offset + page_size - 1))
+        rows += result.data
+        if len(result.data) < page_size:
+            return rows
+        offset += page_size
+
+
+async def get_profiles_brief(user_ids: list[str]) -> list[dict]:
+    result = await execute(supabase.table("profiles").select("id, username, avatar_url").in_("id", user_ids))
+    return result.data or []
 
-    # Build sector name map
-    sectors_result = supabase.table("sectors").select("id, name, slug").execute()
-    sector_map = {s["id"]: s for s in (sectors_result.data or [])}
 
-    # Group by user, find top sector and compute %
-    from collections import defaultdict
-    user_sectors: dict[str, list[dict]] = defaultdict(list)
-    for row in result.data:
-        user_sectors[row["user_id"]].append(row)
-
-    out: dict[str, dict] = {}
-    for uid, rows in user_sectors.items():
-        total_xp = sum(r["sector_xp"] for r in rows)
-        top = max(rows, key=lambda r: r["sector_xp"])
-        sector_info = sector_map.get(top["sector_id"], {})
-        pct = round(top["sector_xp"] * 100 / total_xp) if total_xp > 0 else 0
-        out[uid] = {
-            "fav_sector": sector_info.get("name"),
-            "fav_sector_slug": sector_info.get("slug"),
-            "fav_sector_pct": pct,
-        }
-    return out
+async def get_user_rank(user_id: str):
+    result = await execute(supabase.table("leaderboard_global").select("*").eq("user_id", user_id))
+    return result.data[0] if result.data else None
 
 
 async def get_users_sector_breakdown(user_ids: list[str]) -> dict[str, list[dict]]:
     """Return top 3 sectors per user, with fill % as share of user's total sector XP."""
     if not user_ids:
         return {}
-    result = (
+    result = await execute(
         supabase.table("leaderboard_sector")
         .select("user_id, sector_id, sector_xp")
         .in_("user_id", user_ids)
-        .execute()
     )
     if not result.data:
         return {}
 
-    sectors_result = supabase.table("sectors").select("id, name, slug").execute()
-    sector_map = {s["id"]: s for s in (sectors_result.data or [])}
+    from app.db.reference import reference_data
+    sector_map = await reference_data.sector_map()
 
     from collections import defaultdict
     user_sectors: dict[str, list[dict]] = defaultdict(list)
@@ -339,138 +626,148 @@ async def get_users_sector_breakdown(user_ids: list[str]) -> dict[str, list[dict
     return out
 
 
-async def get_friends_leaderboard(user_id: str, friend_ids: list[str], period: str = "all_time") -> list[dict]:
-    """Get leaderboard for user + their friends."""
-    all_ids = [user_id] + friend_ids
-    if period == "weekly":
-        result = supabase.table("leaderboard_weekly").select("*").in_("user_id", all_ids).order("rank").execute()
-    elif period == "monthly":
-        result = supabase.table("leaderboard_monthly").select("*").in_("user_id", all_ids).order("rank").execute()
-    else:
-        result = supabase.table("leaderboard_global").select("*").in_("user_id", all_ids).order("rank").execute()
-    # Re-rank within friends
-    entries = sorted(result.data, key=lambda x: x.get("xp", x.get("total_xp", 0)), reverse=True)
-    for i, entry in enumerate(entries):
-        entry["rank"] = i + 1
-
-    # Attach favourite sector info
-    fav_sectors = await get_users_fav_sectors(all_ids)
-    for entry in entries:
-        info = fav_sectors.get(entry["user_id"], {})
-        entry["fav_sector"] = info.get("fav_sector")
-        entry["fav_sector_slug"] = info.get("fav_sector_slug")
-        entry["fav_sector_pct"] = info.get("fav_sector_pct")
+async def get_friends_leaderboard(user_ids: list[str], period: str = "all_time") -> list[dict]:
+    """Leaderboard rows for a set of users, with each user's favourite sector.
 
+    XP and top sector come back from one friends_leaderboard RPC; sector
+    names are resolved from the reference cache.
+    """
+    if not user_ids:
+        return []
+    result = await execute(supabase.rpc("friends_leaderboard", {
+        "p_user_ids": user_ids,
+        "p_period": period,
+    }))
+
+    from app.db.reference import reference_data
+    sector_map = await reference_data.sector_map()
+
+    xp_column = "total_xp" if period == "all_time" else "xp"
+    entries = []
+    for i, row in enumerate(result.data or []):
+        sector = sector_map.get(row["fav_sector_id"], {})
+        entries.append({
+            "user_id": row["user_id"],
+            "username": row["username"],
+            "avatar_url": row["avatar_url"],
+            xp_column: row["xp"],
+            "rank": i + 1,
+            "fav_sector": sector.get("name"),
+            "fav_sector_slug": sector.get("slug"),
+            "fav_sector_pct": row["fav_sector_pct"] if sector else None,
+        })
     return entries
 
 
 async def refresh_leaderboards():
-    supabase.rpc("refresh_leaderboards").execute()
+    await execute(supabase.rpc("refresh_leaderboards"))
 
 
 # --- Sectors ---
 
-async def get_all_sectors():
-    result = supabase.table("sectors").select("*").execute()
-    return result.data
-
+# Reads go through the in-process reference cache (app.db.reference);
+# fetch_* are the raw loaders it refreshes from.
 
-async def get_sector_by_slug(slug: str):
-    result = supabase.table("sectors").select("*").eq("slug", slug).single().execute()
+async def fetch_sectors():
+    result = await execute(supabase.table("sectors").select("*"))
     return result.data
 
 
-# --- Streak ---
+async def get_all_sectors():
+    from app.db.reference import reference_data
+    return await reference_data.sectors()
 
-async def get_streak_days(user_id: str) -> int:
-    result = supabase.table("quiz_attempts").select("completed_at").eq(
-        "user_id", user_id
-    ).order("completed_at", desc=True).execute()
 
-    if not result.data:
-        return 0
+async def get_sector_by_slug(slug: str):
+    from app.db.reference import reference_data
+    return await reference_data.sector_by_slug(slug)
 
-    dates = sorted(set(
-        datetime.fromisoformat(r["completed_at"]).date()
-        for r in result.data
-    ), reverse=True)
 
-    if not dates:
-        return 0
+# --- Streak ---
 
-    today = datetime.utcnow().date()
-    if dates[0] != today and dates[0] != today - timedelta(days=1):
+def streak_from_profile(profile: dict | None) -> int:
+    """Current quiz streak from a profile row's current_streak/last_active_date columns."""
+    if not profile or not profile.get("last_active_date"):
         return 0
-
-    streak = 1
-    for i in range(1, len(dates)):
-        if (dates[i - 1] - dates[i]).days == 1:
-            streak += 1
-        else:
-            break
-    return streak
+    last_active = date.fromisoformat(profile["last_active_date"])
+    if last_active < datetime.utcnow().date() - timedelta(days=1):
+        return 0
+    return profile.get("current_streak") or 0
 
 
 # --- Friendships ---
 
 async def send_friend_request(requester_id: str, addressee_id: str) -> dict:
-    result = supabase.table("friendships").insert({
+    result = await execute(supabase.table("friendships").insert({
         "requester_id": requester_id,
         "addressee_id": addressee_id,
         "status": "pending",
-    }).execute()
+    }))
+    from app.db.social_graph import social_graph
+    social_graph.apply(result.data[0])
     return result.data[0]
 
 
 async def get_friendship(friendship_id: str) -> dict | None:
-    result = supabase.table("friendships").select("*").eq("id", friendship_id).execute()
+    result = await execute(supabase.table("friendships").select("*").eq("id", friendship_id))
     return result.data[0] if result.data else None
 
 
 async def get_existing_friendship(user_a: str, user_b: str) -> dict | None:
     """Check if any friendship exists between two users (in either direction)."""
-    result = supabase.table("friendships").select("*").or_(
+    result = await execute(supabase.table("friendships").select("*").or_(
         f"and(requester_id.eq.{user_a},addressee_id.eq.{user_b}),and(requester_id.eq.{user_b},addressee_id.eq.{user_a})"
-    ).execute()
+    ))
     return result.data[0] if result.data else None
 
 
 async def update_friendship_status(friendship_id: str, status: str):
-    supabase.table("friendships").update({
+    result = await execute(supabase.table("friendships").update({
         "status": status,
         "updated_at": datetime.utcnow().isoformat(),
-    }).eq("id", friendship_id).execute()
+    }).eq("id", friendship_id))
+    from app.db.social_graph import social_graph
+    for row in result.data or []:
+        social_graph.apply(row)
 
 
 async def delete_friendship(friendship_id: str):
-    supabase.table("friendships").delete().eq("id", friendship_id).execute()
+    result = await execute(supabase.table("friendships").delete().eq("id", friendship_id))
+    from app.db.social_graph import social_graph
+    for row in result.data or []:
+        social_graph.apply(row, deleted=True)
 
 
 async def get_accepted_friends(user_id: str) -> list[dict]:
     """Get all accepted friends for a user with profile info."""
-    result = supabase.table("friendships").select(
+    result = await execute(supabase.table("friendships").select(
         "id, requester_id, addressee_id, profiles!friendships_requester_id_fkey(id, username, display_name, avatar_url, total_xp), addressee:profiles!friendships_addressee_id_fkey(id, username, display_name, avatar_url, total_xp)"
     ).eq("status", "accepted").or_(
         f"requester_id.eq.{user_id},addressee_id.eq.{user_id}"
-    ).execute()
+    ))
     return result.data
 
 
 async def get_pending_requests(user_id: str) -> list[dict]:
     """Get pending friend requests addressed to this user."""
-    result = supabase.table("friendships").select(
+    result = await execute(supabase.table("friendships").select(
         "id, requester_id, created_at, profiles!friendships_requester_id_fkey(id, username, display_name, avatar_url, total_xp)"
-    ).eq("addressee_id", user_id).eq("status", "pending").order("created_at", desc=True).execute()
+    ).eq("addressee_id", user_id).eq("status", "pending").order("created_at", desc=True))
     return result.data
 
 
 async def get_friend_ids(user_id: str) -> list[str]:
-    """Get IDs of all accepted friends."""
-    result = supabase.table("friendships").select(
+    """Get IDs of all accepted friends, from the in-process social graph."""
+    from app.db.social_graph import social_graph
+    return list(await social_graph.friends(user_id))
+
+
+async def fetch_friend_ids(user_id: str) -> list[str]:
+    result = await execute(supabase.table("friendships").select(
         "requester_id, addressee_id"
     ).eq("status", "accepted").or_(
         f"requester_id.eq.{user_id},addressee_id.eq.{user_id}"
-    ).execute()
+    ))
     ids = []
     for row in result.data:
         ids.append(row["addressee_id"] if row["requester_id"] == user_id else row["requester_id"])
@@ -479,39 +776,30 @@ async def get_friend_ids(user_id: str) -> list[str]:
 
 async def search_users(query: str, current_user_id: str) -> list[dict]:
     """Search profiles by username or display_name (partial match), excluding current user."""
-    result = supabase.table("profiles").select(
+    result = await execute(supabase.table("profiles").select(
         "id, username, display_name, avatar_url, total_xp"
-    ).or_(f"username.ilike.%{query}%,display_name.ilike.%{query}%").neq("id", current_user_id).limit(10).execute()
+    ).or_(f"username.ilike.%{query}%,display_name.ilike.%{query}%").neq("id", current_user_id).limit(10))
     return result.data
 
 
 async def get_profile_by_username(username: str) -> dict | None:
-    result = supabase.table("profiles").select(
+    result = await execute(supabase.table("profiles").select(
         "id, username, display_name, avatar_url, total_xp"
-    ).eq("username", username).execute()
+    ).eq("username", username))
     return result.data[0] if result.data else None
 
 
 # --- Activity Feed ---
 
 async def insert_activity(user_id: str, activity_type: str, metadata: dict) -> dict:
-    result = supabase.table("activity_feed").insert({
+    result = await execute(supabase.table("activity_feed").insert({
         "user_id": user_id,
         "activity_type": activity_type,
         "metadata": metadata,
-    }).execute()
+    }))
     return result.data[0]
 
 
-async def has_recent_activity(user_id: str, activity_type: str, metadata_key: str, metadata_value: str, hours: int = 24) -> bool:
-    """Check if a similar activity exists within the last N hours (dedup)."""
-    cutoff = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
-    result = supabase.table("activity_feed").select("id").eq(
-        "user_id", user_id
-    ).eq("activity_type", activity_type).gte("created_at", cutoff).execute()
-    return len(result.data) > 0
-
-
 async def get_friends_feed(user_id: str, friend_ids: list[str], cursor: str | None = None, limit: int = 20) -> list[dict]:
     """Get activity feed for a list of friend IDs."""
     if not friend_ids:
@@ -524,7 +812,7 @@ async def get_friends_feed(user_id: str, friend_ids: list[str], cursor: str | No
     if cursor:
         query = query.lt("created_at", cursor)
 
-    result = query.execute()
+    result = await execute(query)
     return result.data
 
 
@@ -532,204 +820,216 @@ async def get_activity_reactions(activity_ids: list[str]) -> list[dict]:
     """Get all reactions for a list of activity IDs."""
     if not activity_ids:
         return []
-    result = supabase.table("activity_reactions").select("*").in_("activity_id", activity_ids).execute()
+    result = await execute(supabase.table("activity_reactions").select("*").in_("activity_id", activity_ids))
     return result.data
 
 
 async def upsert_reaction(activity_id: str, user_id: str, emoji: str):
     """Add or update a reaction. Uses upsert on (activity_id, user_id)."""
-    supabase.table("activity_reactions").upsert({
+    await execute(supabase.table("activity_reactions").upsert({
         "activity_id": activity_id,
         "user_id": user_id,
         "emoji": emoji,
-    }, on_conflict="activity_id,user_id").execute()
+    }, on_conflict="activity_id,user_id"))
 
 
 async def delete_reaction(activity_id: str, user_id: str):
-    supabase.table("activity_reactions").delete().eq(
+    await execute(supabase.table("activity_reactions").delete().eq(
         "activity_id", activity_id
-    ).eq("user_id", user_id).execute()
+    ).eq("user_id", user_id))
 
 
 # ── Daily Quiz ──────────────────────────────────────────────
 
 async def get_daily_quiz_by_date(date_str: str):
-    result = supabase.table("daily_quizzes").select("*").eq("date", date_str).limit(1).execute()
+    result = await execute(supabase.table("daily_quizzes").select("*").eq("date", date_str).limit(1))
     return result.data[0] if result.data else None
 
 
 async def get_daily_quiz_by_id(quiz_id: int):
-    result = supabase.table("daily_quizzes").select("*").eq("id", quiz_id).limit(1).execute()
+    result = await execute(supabase.table("daily_quizzes").select("*").eq("id", quiz_id).limit(1))
     return result.data[0] if result.data else None
 
 
 async def insert_daily_quiz(date_str: str, questions: list[dict], source_article_ids: list[int]):
-    result = supabase.table("daily_quizzes").insert({
+    result = await execute(supabase.table("daily_quizzes").insert({
         "date": date_str,
         "questions": questions,
         "source_article_ids": source_article_ids,
-    }).execute()
+    }))
     return result.data[0] if result.data else None
 
 
 async def get_daily_quiz_attempt(user_id: str, quiz_id: int):
-    result = (
+    result = await execute(
         supabase.table("daily_quiz_attempts")
         .select("*")
         .eq("user_id", user_id)
         .eq("quiz_id", quiz_id)
         .limit(1)
-        .execute()
     )
     return result.data[0] if result.data else None
 
 
 async def insert_daily_quiz_attempt(user_id: str, quiz_id: int, answers: list[int], score: int, total: int, xp_earned: int):
-    result = supabase.table("daily_quiz_attempts").insert({
+    result = await execute(supabase.table("daily_quiz_attempts").insert({
         "user_id": user_id,
         "quiz_id": quiz_id,
         "answers": answers,
         "score": score,
         "total_questions": total,
         "xp_earned": xp_earned,
-    }).execute()
+    }))
     return result.data[0] if result.data else None
 
 
 # ── Predict (Stock Predictions) ────────────────────────────
 
-async def get_active_stock_pool():
-    result = supabase.table("stock_pool").select("ticker, name").eq("active", True).execute()
+async def fetch_active_stock_pool():
+    result = await execute(supabase.table("stock_pool").select("ticker, name").eq("active", True))
     return result.data or []
 
 
+async def get_active_stock_pool():
+    from app.db.reference import reference_data
+    return await reference_data.stock_pool()
+
+
 async def get_daily_stocks(date_str: str):
-    result = supabase.table("daily_stocks").select("*").eq("date", date_str).limit(1).execute()
+    result = await execute(supabase.table("daily_stocks").select("*").eq("date", date_str).limit(1))
     return result.data[0] if result.data else None
 
 
 async def insert_daily_stocks(date_str: str, tickers: list[str]):
-    result = supabase.table("daily_stocks").insert({
+    result = await execute(supabase.table("daily_stocks").insert({
         "date": date_str,
         "tickers": tickers,
-    }).execute()
+    }))
     return result.data[0] if result.data else None
 
 
 async def get_user_prediction(user_id: str, date_str: str, ticker: str):
-    result = (
+    result = await execute(
         supabase.table("predictions")
         .select("*")
         .eq("user_id", user_id)
         .eq("date", date_str)
         .eq("ticker", ticker)
         .limit(1)
-        .execute()
     )
     return result.data[0] if result.data else None
 
 
 async def insert_prediction(user_id: str, date_str: str, ticker: str, direction: str, price_at_bet: float):
-    result = supabase.table("predictions").insert({
+    result = await execute(supabase.table("predictions").insert({
         "user_id": user_id,
         "date": date_str,
         "ticker": ticker,
         "direction": direction,
         "price_at_bet": price_at_bet,
-    }).execute()
+    }))
     return result.data[0] if result.data else None
 
 
 async def get_user_predictions(user_id: str, limit: int = 20):
-    result = (
+    result = await execute(
         supabase.table("predictions")
         .select("*, stock_pool(name)")
         .eq("user_id", user_id)
         .order("created_at", desc=True)
         .limit(limit)
-        .execute()
     )
     return result.data or []
 
 
-async def get_pending_predictions():
-    result = (
-        supabase.table("predictions")
-        .select("*")
-        .eq("result", "pending")
-        .execute()
-    )
-    return result.data or []
+PREDICTION_WIN_XP = 50
 
 
-async def resolve_prediction(prediction_id: int, price_at_close: float, result: str, xp_earned: int):
-    from datetime import datetime, timezone
-    supabase.table("predictions").update({
-        "price_at_close": price_at_close,
-        "result": result,
-        "xp_earned": xp_earned,
-        "resolved_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("id", prediction_id).execute()
+async def get_next_pending_prediction_date(after: str | None, up_to: str) -> str | None:
+    """Earliest date after `after` (exclusive) and up to `up_to` that still has pending predictions."""
+    query = supabase.table("predictions").select("date").eq("result", "pending").lte("date", up_to)
+    if after:
+        query = query.gt("date", after)
+    result = await execute(query.order("date").limit(1))
+    return result.data[0]["date"] if result.data else None
+
+
+async def settle_predictions(date_str: str, closes: dict[str, float]) -> dict:
+    """Resolve a date's pending predictions for the given closing prices in one statement.
+
+    Returns {"settled", "wins", "users_awarded", "grants": [{user_id, amount}]}.
+    Rows already settled are untouched, so re-running is safe.
+    """
+    result = await execute(supabase.rpc("settle_predictions", {
+        "p_date": date_str,
+        "closes": [{"ticker": t, "close": c} for t, c in closes.items()],
+        "win_xp": PREDICTION_WIN_XP,
+    }))
+    return result.data
 
 
 # --- Weekly Reports ---
 
 async def get_weekly_report(report_id: int, user_id: str):
-    result = supabase.table("weekly_reports").select("*").eq("id", report_id).eq("user_id", user_id).single().execute()
+    result = await execute(supabase.table("weekly_reports").select("*").eq("id", report_id).eq("user_id", user_id).single())
     return result.data
 
 
 async def get_latest_weekly_report(user_id: str):
-    result = supabase.table("weekly_reports").select("*").eq("user_id", user_id).order("week_start", desc=True).limit(1).execute()
+    result = await execute(supabase.table("weekly_reports").select("*").eq("user_id", user_id).order("week_start", desc=True).limit(1))
     return result.data[0] if result.data else None
 
 
-async def get_weekly_reports(user_id: str, page: int = 1, limit: int = 10):
-    offset = (page - 1) * limit
-    result = supabase.table("weekly_reports").select("*", count="exact").eq(
-        "user_id", user_id
-    ).order("week_start", desc=True).range(offset, offset + limit - 1).execute()
+async def get_weekly_reports(
+    user_id: str,
+    page: int = 1,
+    limit: int = 10,
+    cursor: str | None = None,
+    count: str | None = None,
+):
+    query = supabase.table("weekly_reports").select("*", count=count).eq("user_id", user_id)
+    result = await execute(_paginate(query, "week_start", limit, page, cursor))
     return result.data, result.count
 
 
 async def insert_weekly_report(data: dict):
-    result = supabase.table("weekly_reports").insert(data).execute()
+    result = await execute(supabase.table("weekly_reports").insert(data))
     return result.data[0] if result.data else None
 
 
 async def update_weekly_report(report_id: int, data: dict):
-    supabase.table("weekly_reports").update(data).eq("id", report_id).execute()
+    await execute(supabase.table("weekly_reports").update(data).eq("id", report_id))
 
 
 async def get_users_with_favorites():
     """Get distinct user_ids that have at least one favorite sector."""
-    result = supabase.table("user_favorites").select("user_id").execute()
+    result = await execute(supabase.table("user_favorites").select("user_id"))
     return list(set(r["user_id"] for r in result.data))
 
 
 async def get_user_quiz_attempts_for_week(user_id: str, week_start: str, week_end: str):
     """Get all quiz attempts for a user within a date range, with questions."""
-    result = supabase.table("quiz_attempts").select(
+    result = await execute(supabase.table("quiz_attempts").select(
         "*, quizzes(article_id, quiz_questions(question_text, options, correct_index, explanation))"
-    ).eq("user_id", user_id).gte("completed_at", week_start).lte("completed_at", week_end).execute()
+    ).eq("user_id", user_id).gte("completed_at", week_start).lte("completed_at", week_end))
     return result.data or []
 
 
 async def get_user_daily_quiz_attempts_for_week(user_id: str, week_start: str, week_end: str):
     """Get all daily quiz attempts for a user within a date range."""
-    result = supabase.table("daily_quiz_attempts").select(
+    result = await execute(supabase.table("daily_quiz_attempts").select(
         "*, daily_quizzes(questions)"
-    ).eq("user_id", user_id).gte("completed_at", week_start).lte("completed_at", week_end).execute()
+    ).eq("user_id", user_id).gte("completed_at", week_start).lte("completed_at", week_end))
     return result.data or []
 
 
 async def get_articles_for_sectors_in_range(sector_ids: list[int], start_date: str, end_date: str):
     """Get articles published in a date range for given sectors."""
-    article_ids_result = supabase.table("article_sectors").select("article_id").in_("sector_id", sector_ids).execute()
-    ids = list(set(r["article_id"] for r in article_ids_result.data))
-    if not ids:
+    if not sector_ids:
         return []
-    result = supabase.table("articles").select(
-        "id, headline, ai_summary, published_at, article_sectors(sector_id)"
-    ).eq("processing_status", "done").in_("id", ids).gte("published_at", start_date).lte("published_at", end_date).order("published_at", desc=True).execute()
+    result = await execute(supabase.table("articles").select(
+        "id, headline, ai_summary, published_at, article_sectors(sector_id), sector_filter:article_sectors!inner(sector_id)"
+    ).eq("processing_status", "done").in_("sector_filter.sector_id", sector_ids).gte("published_at", start_date).lte("published_at", end_date).order("published_at", desc=True))
+    for row in result.data:
+        row.pop("sector_filter", None)
     return result.data or []
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+
+from app.db import supabase as db
+
+UNREAD_TTL_SECONDS = 10 * 60
+UNREAD_MAX_ENTRIES = 50_000
+
+
+class UnreadCounts:
+    """In-process per-user unread notification counters.
+
+    A user's count is loaded from the database on first read and then kept
+    current by the notification write functions in app.db.supabase. Users
+    not in the cache are left alone by writes (the next read loads them), and
+    entries are reloaded after the TTL as a safety net against missed writes.
+    """
+
+    def __init__(self, ttl_seconds: float = UNREAD_TTL_SECONDS, max_entries: int = UNREAD_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._counts: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str) -> int:
+        cached = self._counts.get(user_id)
+        if cached and time.monotonic() - cached[1] < self.ttl_seconds:
+            self._counts.move_to_end(user_id)
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        count = await db.count_unread_notifications(user_id)
+        self._store(user_id, count, time.monotonic())
+        return count
+
+    def _store(self, user_id: str, count: int, loaded_at: float):
+        self._counts[user_id] = (max(0, count), loaded_at)
+        self._counts.move_to_end(user_id)
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+
+    def adjust(self, user_id: str, delta: int):
+        cached = self._counts.get(user_id)
+        if cached:
+            self._store(user_id, cached[0] + delta, cached[1])
+
+    def reset(self, user_id: str):
+        """The user has no unread notifications left."""
+        self._store(user_id, 0, time.monotonic())
+
+    def clear(self):
+        self._counts.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+unread_counts = UnreadCounts()
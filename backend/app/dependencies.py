@@ -1,18 +1,128 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+import jwt
 from fastapi import Depends, HTTPException, Header
-from supabase import create_client
+from supabase import AuthApiError, create_client
 
 from app.config import settings
 
 supabase = create_client(settings.supabase_url, settings.supabase_service_key)
 
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_ENTRIES = 10_000
+# Revocation policy: each token is re-checked with Supabase Auth at most this
+# often, so a revoked session keeps working for up to this long
+REVOCATION_CHECK_INTERVAL_SECONDS = 5 * 60
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens locally (HS256 + expiry) and caches the result.
+
+    Verified tokens are cached by hash (LRU) for TOKEN_CACHE_TTL_SECONDS.
+    Revocation is checked against Supabase Auth in the background, at most
+    once per token every REVOCATION_CHECK_INTERVAL_SECONDS: that is one Auth
+    round trip per active token per interval, off the request path, and a
+    revoked token stops working within about one interval. Tokens that can't
+    be checked locally (no JWT secret configured, non-HS256) are verified
+    remotely instead.
+    """
+
+    def __init__(self, jwt_secret: str | None):
+        self._secret = jwt_secret
+        # key -> (user_id, valid_until, revocation_checked_at)
+        self._cache: OrderedDict[str, tuple[str, float, float]] = OrderedDict()
+        self._revoked: dict[str, float] = {}
+        self._revoked_pruned_at = 0.0
+        self._background: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _decode_local(self, token: str) -> dict | None:
+        """Return verified claims, or None if the token can't be checked locally."""
+        if not self._secret or jwt.get_unverified_header(token).get("alg") != "HS256":
+            return None
+        return jwt.decode(
+            token, self._secret, algorithms=["HS256"], audience="authenticated",
+            options={"require": ["exp", "sub"]},
+        )
+
+    @staticmethod
+    async def _fetch_user_id(token: str) -> str | None:
+        res = await asyncio.to_thread(supabase.auth.get_user, token)
+        return res.user.id if res and res.user else None
+
+    async def _check_revoked(self, key: str, token: str, expires_at: float):
+        try:
+            user_id = await self._fetch_user_id(token)
+        except AuthApiError:
+            user_id = None
+        except Exception as e:
+            # Auth unreachable: keep trusting the signature, retry on the next refill
+            print(f"[auth] revocation check failed: {e}")
+            return
+        if user_id is None:
+            self._revoke(key, expires_at)
+
+    def _revoke(self, key: str, expires_at: float):
+        self._cache.pop(key, None)
+        self._revoked[key] = expires_at
+
+    def _remember(self, key: str, user_id: str, expires_at: float, checked_at: float):
+        self._cache[key] = (user_id, min(time.time() + TOKEN_CACHE_TTL_SECONDS, expires_at), checked_at)
+        self._cache.move_to_end(key)
+        if len(self._cache) > TOKEN_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def verify(self, token: str) -> str:
+        """Return the user id for a valid token; raise jwt.InvalidTokenError otherwise."""
+        key = self._key(token)
+        now = time.time()
+
+        cached = self._cache.get(key)
+        if cached and cached[1] > now:
+            self._cache.move_to_end(key)
+            return cached[0]
+        if key in self._revoked:
+            raise jwt.InvalidTokenError("Token revoked")
+        if now - self._revoked_pruned_at >= TOKEN_CACHE_TTL_SECONDS:
+            self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            self._revoked_pruned_at = now
+
+        claims = self._decode_local(token)
+        if claims is None:
+            user_id = await self._fetch_user_id(token)
+            if user_id is None:
+                raise jwt.InvalidTokenError("Rejected by Supabase Auth")
+            expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp", now)
+            checked_at = now
+        else:
+            user_id, expires_at = claims["sub"], claims["exp"]
+            # An expired cache entry still remembers when Auth was last asked
+            checked_at = cached[2] if cached else 0.0
+            if now - checked_at >= REVOCATION_CHECK_INTERVAL_SECONDS:
+                checked_at = now
+                task = asyncio.create_task(self._check_revoked(key, token, expires_at))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+        self._remember(key, user_id, expires_at, checked_at)
+        return user_id
+
+
+token_verifier = TokenVerifier(
+    None if settings.supabase_jwt_secret in ("", "changeme") else settings.supabase_jwt_secret
+)
+
 
 async def get_current_user(authorization: str = Header(...)) -> str:
     try:
         token = authorization.replace("Bearer ", "")
-        res = supabase.auth.get_user(token)
-        if not res or not res.user:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return res.user.id
+        return await token_verifier.verify(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
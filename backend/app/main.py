@@ -50,6 +50,13 @@ app.include_router(weekly_report.router)
 @app.get("/api/v1/health")
 async def health():
     from app.scheduler.jobs import _tasks
+    from app.db.social_graph import social_graph
+    from app.db.unread_counts import unread_counts
+    from app.services.finnhub_ws import finnhub_proxy
+    from app.services.leaderboard import leaderboard
+    from app.services.notification_bus import notification_bus
+    from app.services.quote_cache import quote_cache
+    from app.services.recent_articles import recent_articles
     task_info = [
         {
             "name": t.get_name(),
@@ -58,7 +65,17 @@ async def health():
         }
         for t in _tasks
     ]
-    return {"status": "ok", "tasks": task_info}
+    return {
+        "status": "ok",
+        "tasks": task_info,
+        "recent_articles": recent_articles.stats(),
+        "notification_push": notification_bus.stats(),
+        "unread_counts": unread_counts.stats(),
+        "leaderboard": leaderboard.stats(),
+        "social_graph": social_graph.stats(),
+        "market_stream": finnhub_proxy.stats(),
+        "quote_cache": quote_cache.stats(),
+    }
 
 
 @app.post("/api/v1/health/trigger-ingest")
@@ -70,6 +87,16 @@ async def trigger_ingest():
     return {"status": "ok", "triggered": True}
 
 
+@app.post("/api/v1/health/refresh-reference-data")
+async def refresh_reference_data():
+    """Reload the cached sectors/stock_pool tables after editing them."""
+    from app.db.reference import reference_data
+    reference_data.invalidate()
+    sectors = await reference_data.sectors()
+    stocks = await reference_data.stock_pool()
+    return {"status": "ok", "sectors": len(sectors), "stocks": len(stocks)}
+
+
 @app.post("/api/v1/health/trigger-weekly-report")
 async def trigger_weekly_report():
     """Manually trigger weekly report generation — for debugging."""
@@ -9,22 +9,38 @@ router = APIRouter(prefix="/api/v1/articles", tags=["articles"])
 IS_DEBUG = settings.debug
 
 
+INVALID_CURSOR = {"success": False, "error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}}
+
+
 @router.get("/feed")
 async def get_feed(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(False),
     user_id: str = Depends(get_current_user),
 ):
     favorites = await db.get_user_favorites(user_id)
     if not favorites:
-        return {"success": True, "data": [], "meta": {"page": page, "limit": limit, "total": 0}}
+        return {"success": True, "data": [], "meta": {"page": page, "limit": limit, "total": 0, "next_cursor": None}}
 
     sector_ids = [f["sector_id"] for f in favorites]
-    articles, total = await db.get_articles_by_sector_ids(sector_ids, page=page, limit=limit)
+    try:
+        articles, total = await db.get_articles_by_sector_ids(
+            sector_ids, page=page, limit=limit, cursor=cursor,
+            count="estimated" if with_total else None,
+        )
+    except ValueError:
+        return INVALID_CURSOR
     return {
         "success": True,
         "data": articles,
-        "meta": {"page": page, "limit": limit, "total": total},
+        "meta": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "next_cursor": db.next_cursor(articles, limit, "published_at"),
+        },
     }
 
 
@@ -34,14 +50,25 @@ async def list_articles(
     category: str | None = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(False),
 ):
-    articles, total = await db.get_articles(
-        sector=sector, category=category, page=page, limit=limit
-    )
+    try:
+        articles, total = await db.get_articles(
+            sector=sector, category=category, page=page, limit=limit, cursor=cursor,
+            count="estimated" if with_total else None,
+        )
+    except ValueError:
+        return INVALID_CURSOR
     return {
         "success": True,
         "data": articles,
-        "meta": {"page": page, "limit": limit, "total": total},
+        "meta": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "next_cursor": db.next_cursor(articles, limit, "published_at"),
+        },
     }
 
 
@@ -94,7 +121,7 @@ async def debug_bulk(background_tasks: BackgroundTasks, user_id: str = Depends(g
     if not IS_DEBUG:
         raise HTTPException(status_code=404, detail="Not found")
     background_tasks.add_task(_bulk_process)
-    _, pending_count = await db.get_articles(status="pending", page=1, limit=1)
+    _, pending_count = await db.get_articles(status="pending", page=1, limit=1, count="exact")
     return {"status": "started", "pending": pending_count or 0}
 
 
@@ -124,9 +151,9 @@ async def debug_fix_sources(background_tasks: BackgroundTasks, user_id: str = De
 async def _fix_sources():
     from app.services.pipeline import resolve_url
     # Get all done articles with finnhub proxy URLs
-    result = db.supabase.table("articles").select("id, original_url, source_name").eq(
+    result = await db.execute(db.supabase.table("articles").select("id, original_url, source_name").eq(
         "processing_status", "done"
-    ).like("original_url", "%finnhub.io/api/news%").execute()
+    ).like("original_url", "%finnhub.io/api/news%"))
 
     fixed = 0
     for article in result.data:
@@ -147,9 +174,9 @@ async def debug_reprocess_lessons(background_tasks: BackgroundTasks):
     """Re-process existing articles with the new lesson prompt."""
     background_tasks.add_task(_reprocess_lessons)
     # Count articles needing reprocessing
-    result = db.supabase.table("articles").select("id", count="exact").eq(
+    result = await db.execute(db.supabase.table("articles").select("id", count="exact").eq(
         "processing_status", "done"
-    ).is_("lesson_data", "null").execute()
+    ).is_("lesson_data", "null"))
     return {"status": "started", "pending": result.count or 0}
 
 
@@ -159,9 +186,9 @@ async def _reprocess_lessons():
     from app.services import llm
 
     # Get all done articles without lesson_data
-    result = db.supabase.table("articles").select(
+    result = await db.execute(db.supabase.table("articles").select(
         "id, headline, raw_content"
-    ).eq("processing_status", "done").is_("lesson_data", "null").execute()
+    ).eq("processing_status", "done").is_("lesson_data", "null"))
 
     articles = [a for a in (result.data or []) if (a.get("raw_content") or "") and len(a.get("raw_content", "")) >= 20]
     print(f"Reprocessing {len(articles)} articles for lessons (all parallel)")
@@ -182,11 +209,11 @@ async def _reprocess_lessons():
             existing_quiz = await db.get_quiz_by_article(article_id)
             if existing_quiz:
                 quiz_id = existing_quiz["id"]
-                attempts = db.supabase.table("quiz_attempts").select("id").eq("quiz_id", quiz_id).limit(1).execute()
+                attempts = await db.execute(db.supabase.table("quiz_attempts").select("id").eq("quiz_id", quiz_id).limit(1))
                 if attempts.data:
                     return True
-                db.supabase.table("quiz_questions").delete().eq("quiz_id", quiz_id).execute()
-                db.supabase.table("quizzes").delete().eq("id", quiz_id).execute()
+                await db.execute(db.supabase.table("quiz_questions").delete().eq("quiz_id", quiz_id))
+                await db.execute(db.supabase.table("quizzes").delete().eq("id", quiz_id))
 
             quiz_rows = [
                 {
@@ -4,6 +4,7 @@ from app.dependencies import get_current_user
 from app.db import supabase as db
 from app.models.daily_quiz import DailyQuizSubmit
 from app.services.daily_quiz import get_or_create_daily_quiz
+from app.services.leaderboard import leaderboard
 
 
 class DailyQuizCheckBody(BaseModel):
@@ -101,8 +102,7 @@ async def submit_daily_quiz(
     await db.insert_daily_quiz_attempt(user_id, quiz["id"], body.answers, score, len(questions), xp_earned)
 
     # Award XP
-    if xp_earned > 0:
-        await db.add_xp(user_id, xp_earned)
+    leaderboard.record_xp(await db.grant_xp({user_id: xp_earned}, f"daily_quiz:{quiz['id']}:{user_id}"))
 
     # Log activity
     await db.insert_activity(user_id, "daily_quiz_completed", {
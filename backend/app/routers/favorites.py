@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 
 from app.db import supabase as db
 from app.dependencies import get_current_user
+from app.services.notifications import sector_subscribers
 
 router = APIRouter(prefix="/api/v1/favorites", tags=["favorites"])
 
@@ -23,6 +24,7 @@ async def add_favorite(
     user_id: str = Depends(get_current_user),
 ):
     await db.add_favorite(user_id, body.sector_id)
+    sector_subscribers.add(user_id, body.sector_id)
     return {"success": True, "data": {"sector_id": body.sector_id, "gauge_score": 50}}
 
 
@@ -32,6 +34,7 @@ async def remove_favorite(
     user_id: str = Depends(get_current_user),
 ):
     await db.remove_favorite(user_id, sector_id)
+    sector_subscribers.remove(user_id, sector_id)
     return {"success": True}
 
 
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, Query
 
 from app.db import supabase as db
 from app.dependencies import get_current_user
+from app.services.leaderboard import leaderboard
+from app.services.notifications import send_notification
 
 router = APIRouter(prefix="/api/v1/friends", tags=["friends"])
 
@@ -31,7 +33,7 @@ async def send_friend_request(
             # Notify addressee
             addressee_profile = await db.get_profile(user_id)
             username = addressee_profile.get("username") or "Someone"
-            await db.insert_notification(
+            await send_notification(
                 addressee_id, "friend_request",
                 "New friend request",
                 f"{username} sent you a friend request",
@@ -44,7 +46,7 @@ async def send_friend_request(
     # Notify addressee
     requester_profile = await db.get_profile(user_id)
     username = requester_profile.get("username") or "Someone"
-    await db.insert_notification(
+    await send_notification(
         addressee_id, "friend_request",
         "New friend request",
         f"{username} sent you a friend request",
@@ -68,11 +70,12 @@ async def accept_friend_request(
         return {"success": False, "error": {"code": "INVALID", "message": "Request is not pending"}}
 
     await db.update_friendship_status(friendship_id, "accepted")
+    leaderboard.invalidate_friends(friendship["requester_id"], user_id)
 
     # Notify requester
     accepter_profile = await db.get_profile(user_id)
     username = accepter_profile.get("username") or "Someone"
-    await db.insert_notification(
+    await send_notification(
         friendship["requester_id"], "friend_accepted",
         "Friend request accepted",
         f"{username} accepted your friend request",
@@ -111,6 +114,7 @@ async def unfriend(
         return {"success": False, "error": {"code": "FORBIDDEN", "message": "Not your friendship"}}
 
     await db.delete_friendship(friendship_id)
+    leaderboard.invalidate_friends(friendship["requester_id"], friendship["addressee_id"])
     return {"success": True}
 
 
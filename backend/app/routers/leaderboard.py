@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, Query
 
 from app.db import supabase as db
 from app.dependencies import get_current_user, get_optional_user
+from app.services.leaderboard import leaderboard
 
 router = APIRouter(prefix="/api/v1/leaderboard", tags=["leaderboard"])
 
@@ -10,13 +11,15 @@ router = APIRouter(prefix="/api/v1/leaderboard", tags=["leaderboard"])
 async def get_global_leaderboard(
     period: str = Query("all_time", pattern=r'^(all_time|weekly|monthly)$'),
 ):
-    data = await db.get_global_leaderboard(period)
+    data = await leaderboard.top(period)
+    if data is None:
+        data = await db.get_global_leaderboard(period)
     return {"success": True, "data": data}
 
 
 @router.get("/me")
 async def get_my_rank(user_id: str = Depends(get_current_user)):
-    rank = await db.get_user_rank(user_id)
+    rank = await leaderboard.user_rank(user_id)
     return {"success": True, "data": rank}
 
 
@@ -25,8 +28,7 @@ async def get_friends_leaderboard(
     period: str = Query("all_time", pattern=r'^(all_time|weekly|monthly)$'),
     user_id: str = Depends(get_current_user),
 ):
-    friend_ids = await db.get_friend_ids(user_id)
-    data = await db.get_friends_leaderboard(user_id, friend_ids, period)
+    data = await leaderboard.friends(user_id, period)
     return {"success": True, "data": data}
 
 
@@ -38,5 +40,7 @@ async def get_sector_leaderboard(
     sector = await db.get_sector_by_slug(sector_slug)
     if not sector:
         return {"success": False, "error": {"code": "NOT_FOUND", "message": "Sector not found"}}
-    data = await db.get_sector_leaderboard(sector["id"], period)
+    data = await leaderboard.sector_top(sector["id"])
+    if data is None:
+        data = await db.get_sector_leaderboard(sector["id"], period)
     return {"success": True, "data": data}
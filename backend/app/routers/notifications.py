@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 
 from app.db import supabase as db
-from app.dependencies import get_current_user
+from app.db.unread_counts import unread_counts
+from app.dependencies import get_current_user, token_verifier
+from app.services.notification_bus import notification_bus
 
 router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
 
@@ -10,16 +15,33 @@ router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
 async def get_notifications(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(False),
     user_id: str = Depends(get_current_user),
 ):
-    data, total = await db.get_notifications(user_id, page, limit)
+    try:
+        data, total = await db.get_notifications(
+            user_id, page, limit, cursor=cursor, count="exact" if with_total else None,
+        )
+    except ValueError:
+        return {"success": False, "error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}}
     return {
         "success": True,
         "data": data,
-        "meta": {"page": page, "limit": limit, "total": total},
+        "meta": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "next_cursor": db.next_cursor(data, limit, "created_at"),
+        },
     }
 
 
+@router.get("/unread-count")
+async def get_unread_count(user_id: str = Depends(get_current_user)):
+    return {"success": True, "data": {"unread_count": await unread_counts.get(user_id)}}
+
+
 @router.patch("/{notification_id}")
 async def mark_read(
     notification_id: int,
@@ -48,3 +70,31 @@ async def delete_one(
 ):
     await db.delete_notification(notification_id, user_id)
     return {"success": True}
+
+
+@router.websocket("/ws")
+async def notifications_ws(ws: WebSocket):
+    """Push coalesced notification events. The first client message must be {"type": "auth", "token": ...}."""
+    await ws.accept()
+    try:
+        msg = json.loads(await asyncio.wait_for(ws.receive_text(), timeout=10))
+        user_id = await token_verifier.verify(msg.get("token", ""))
+    except Exception:
+        await ws.close(code=4401)
+        return
+
+    queue = notification_bus.subscribe(user_id)
+
+    async def pump():
+        while True:
+            await ws.send_json(await queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            await ws.receive_text()  # nothing to handle; keeps the disconnect visible
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        notification_bus.unsubscribe(user_id, queue)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends
 from app.db import supabase as db
 from app.dependencies import get_current_user, supabase as sb_client
 from app.models.user import ProfileUpdate
+from app.services.leaderboard import leaderboard
 
 router = APIRouter(prefix="/api/v1/profile", tags=["profile"])
 
@@ -10,8 +11,8 @@ router = APIRouter(prefix="/api/v1/profile", tags=["profile"])
 @router.get("")
 async def get_dashboard(user_id: str = Depends(get_current_user)):
     profile = await db.get_profile(user_id)
-    streak = await db.get_streak_days(user_id)
-    rank = await db.get_user_rank(user_id)
+    streak = db.streak_from_profile(profile)
+    rank = await leaderboard.user_rank(user_id)
     favorites = await db.get_user_favorites(user_id)
 
     return {
@@ -43,4 +44,6 @@ async def update_profile(
             except Exception:
                 pass  # Non-critical: profile DB is source of truth
     profile = await db.get_profile(user_id)
+    if profile:
+        leaderboard.update_profile(user_id, profile.get("username"), profile.get("avatar_url"))
     return {"success": True, "data": profile}
@@ -7,12 +7,28 @@ router = APIRouter(prefix="/api/v1/weekly-reports", tags=["weekly-reports"])
 
 
 @router.get("")
-async def list_reports(page: int = 1, limit: int = 10, user_id: str = Depends(get_current_user)):
-    reports, total = await db.get_weekly_reports(user_id, page, limit)
+async def list_reports(
+    page: int = 1,
+    limit: int = 10,
+    cursor: str | None = None,
+    with_total: bool = False,
+    user_id: str = Depends(get_current_user),
+):
+    try:
+        reports, total = await db.get_weekly_reports(
+            user_id, page, limit, cursor=cursor, count="exact" if with_total else None,
+        )
+    except ValueError:
+        return {"success": False, "error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}}
     return {
         "success": True,
         "data": reports,
-        "meta": {"total": total, "page": page, "limit": limit},
+        "meta": {
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "next_cursor": db.next_cursor(reports, limit, "week_start"),
+        },
     }
 
 
@@ -11,9 +11,11 @@ from app.services.pipeline import (
 )
 from app.services.gauge import process_gauge_decay
 from app.services.xp import award_passive_xp
-from app.db.supabase import refresh_leaderboards
+from app.services.leaderboard import leaderboard
 from app.services.predict import resolve_pending_predictions
 from app.services.weekly_report import generate_all_weekly_reports
+from app.services.recent_articles import recent_articles
+from app.db.reference import reference_data
 
 # Exported so health endpoint can inspect task state
 _tasks: list[asyncio.Task] = []
@@ -76,6 +78,10 @@ async def _process_pending_job():
     await process_pending_articles(batch_size=15)
 
 
+async def _reconcile_leaderboards():
+    await leaderboard.seed()
+
+
 async def _resolve_predictions_daily():
     """Fire at 21:05 UTC on weekdays (market close ET)."""
     while True:
@@ -105,10 +111,14 @@ async def _cleanup_notifications_daily():
         await asyncio.sleep((next_run - now).total_seconds())
         try:
             print("[scheduler] running: cleanup_notifications")
+            from app.db.supabase import execute
             from app.dependencies import supabase
-            supabase.table("notifications").delete().lt(
+            await execute(supabase.table("notifications").delete().lt(
                 "expires_at", datetime.now(timezone.utc).isoformat()
-            ).execute()
+            ))
+            # Expired rows may have been unread; reload counters on next read
+            from app.db.unread_counts import unread_counts
+            unread_counts.clear()
             print("[scheduler] cleaned up expired notifications")
         except asyncio.CancelledError:
             raise
@@ -137,6 +147,21 @@ async def _generate_weekly_reports():
             print(f"[scheduler] 'weekly_reports' error: {e}")
 
 
+async def _warm_caches():
+    """Load in-process caches once at startup (reference tables, recent article keys, leaderboards)."""
+    for name, warm in (
+        ("reference_data", reference_data.refresh),
+        ("recent_articles", recent_articles.warm_up),
+        ("leaderboard", leaderboard.warm),
+    ):
+        try:
+            await warm()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[scheduler] '{name}' warm-up error: {e}")
+
+
 def setup_scheduler() -> list[asyncio.Task]:
     """
     Create all background asyncio tasks.
@@ -145,14 +170,16 @@ def setup_scheduler() -> list[asyncio.Task]:
     """
     global _tasks
     _tasks = [
+        # Warm reference data and the dedup index before the first ingestion cycle
+        asyncio.create_task(_warm_caches(), name="cache_warm"),
         # Process pending articles every 2 min (runs 10 s after startup)
         asyncio.create_task(
             _run_periodically("process_pending", _process_pending_job, 2 * 60, initial_delay=10),
             name="process_pending",
         ),
-        # Refresh leaderboard every 5 min
+        # Reconcile leaderboards hourly (in-process boards are updated live)
         asyncio.create_task(
-            _run_periodically("refresh_lb", refresh_leaderboards, 5 * 60, initial_delay=15),
+            _run_periodically("refresh_lb", _reconcile_leaderboards, 60 * 60, initial_delay=60 * 60),
             name="refresh_lb",
         ),
         # Gauge decay every 30 min
@@ -16,7 +16,7 @@ async def get_or_create_daily_quiz(target_date: str | None = None):
         return existing
 
     # Fetch 5 recent processed articles for quiz material
-    articles, _ = await db.get_articles(status="done", limit=5)
+    articles, _ = await db.get_articles(status="done", limit=5, columns="id, headline, snippet, ai_summary")
     if not articles:
         raise ValueError("No processed articles available for daily quiz")
 
@@ -151,6 +151,35 @@ async def get_quote(symbol: str) -> dict:
         return resp.json()
 
 
+# Stay well under Finnhub's per-second limit when fanning out quote requests
+QUOTE_CONCURRENCY = 5
+
+
+async def get_quotes(symbols: list[str]) -> dict[str, dict]:
+    """Fetch quotes for many symbols concurrently over one connection pool.
+
+    Returns {symbol: quote}; symbols whose request failed are left out.
+    """
+    semaphore = asyncio.Semaphore(QUOTE_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=15) as http:
+        async def fetch(symbol: str):
+            async with semaphore:
+                try:
+                    resp = await http.get(
+                        "https://finnhub.io/api/v1/quote",
+                        params={"symbol": symbol, "token": settings.finnhub_api_key},
+                    )
+                    resp.raise_for_status()
+                    return symbol, resp.json()
+                except Exception as e:
+                    print(f"Finnhub quote error ({symbol}): {e}")
+                    return symbol, None
+
+        results = await asyncio.gather(*(fetch(s) for s in symbols))
+    return {symbol: quote for symbol, quote in results if quote}
+
+
 async def get_candles(symbol: str, resolution: str, from_ts: int, to_ts: int) -> dict:
     """Fetch candle data for charting. Uses the SDK for consistency with other endpoints."""
     loop = asyncio.get_event_loop()
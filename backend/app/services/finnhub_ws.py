@@ -1,80 +1,409 @@
 import asyncio
 import json
+import random
+import time
+from collections import deque
 
 import websockets
 
 from app.config import settings
+from app.services.quote_cache import quote_cache
+
+OVERFLOW_POLICIES = ("drop_oldest", "conflate", "disconnect")
+# Close code sent to clients evicted under the "disconnect" policy (Try Again Later)
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# Upstream reconnects back off exponentially with full jitter; a connection
+# that stayed up this long resets the backoff
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+STABLE_CONNECTION_SECONDS = 30.0
+# Protocol-level pings detect a dead TCP path; Finnhub also sends its own
+# {"type": "ping"} frames, so a silent upstream is treated as dead too
+PING_INTERVAL_SECONDS = 20.0
+PING_TIMEOUT_SECONDS = 20.0
+HEARTBEAT_TIMEOUT_SECONDS = 60.0
+
+
+class _Client:
+    """One downstream connection: its symbols and a bounded send queue drained by its own writer task.
+
+    Queue items are (encoded_frame, trades); encoded_frame is shared between
+    clients that received the same trades and is None after conflation.
+    Clients in conflation mode (flush_interval set) skip the queue: they keep
+    the latest trade per symbol and get one batched frame per interval.
+    """
+
+    def __init__(self, ws, max_queue: int, policy: str, flush_interval: float | None = None):
+        self.ws = ws
+        self.symbols: set[str] = set()
+        # Symbols that have had a live trade since subscribing; snapshots for them are stale
+        self.traded: set[str] = set()
+        self.queue: deque[tuple[str | None, list[dict]]] = deque()
+        self.max_queue = max_queue
+        self.policy = policy
+        self.sent = 0
+        self.dropped = 0
+        self.closing = False
+        self.flush_interval = flush_interval
+        self.latest: dict[str, dict] = {}
+        self.conflated = 0
+        self._ready = asyncio.Event()
+        self.writer: asyncio.Task | None = None
+
+    def push(self, encoded: str | None, trades: list[dict]) -> bool:
+        """Queue a frame, applying the overflow policy. False means the client should be disconnected."""
+        if self.closing:
+            return True
+        if len(self.queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                self.closing = True
+                return False
+            if self.policy == "conflate":
+                # Collapse everything queued into one frame with the latest trade per symbol
+                latest: dict[str, dict] = {}
+                for _, queued in self.queue:
+                    for trade in queued:
+                        latest[trade["s"]] = trade
+                for trade in trades:
+                    latest[trade["s"]] = trade
+                self.dropped += sum(len(q) for _, q in self.queue) + len(trades) - len(latest)
+                self.queue.clear()
+                encoded, trades = None, list(latest.values())
+            else:
+                _, oldest = self.queue.popleft()
+                self.dropped += len(oldest)
+        self.queue.append((encoded, trades))
+        self._ready.set()
+        return True
+
+    def conflate(self, symbol: str, trades: list[dict]):
+        """Fold trades into the pending snapshot: last price and time, volume summed since the last flush."""
+        self.traded.add(symbol)
+        pending = self.latest.get(symbol)
+        volume = sum(t.get("v") or 0 for t in trades) + (pending["v"] if pending else 0)
+        self.conflated += len(trades) - (0 if pending else 1)
+        last = trades[-1]
+        self.latest[symbol] = {"s": symbol, "p": last["p"], "t": last.get("t"), "v": volume, "dp": last.get("dp")}
+        self._ready.set()
+
+    def push_snapshot(self, entries: list[dict]):
+        """Queue last-value entries ({s, p, t, dp}) for symbols just subscribed to."""
+        # A trade that arrived meanwhile is newer than the snapshot
+        entries = [e for e in entries if e["s"] not in self.traded]
+        if not entries:
+            return
+        if self.flush_interval:
+            for entry in entries:
+                self.latest[entry["s"]] = {**entry, "v": 0}
+            self._ready.set()
+        else:
+            self.push(json.dumps({"type": "snapshot", "data": entries}), entries)
+
+    async def run(self):
+        if self.flush_interval:
+            await self._run_conflated()
+            return
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self.queue:
+                encoded, trades = self.queue.popleft()
+                await self.ws.send_text(encoded or json.dumps({"type": "trade", "data": trades}))
+                self.sent += 1
+
+    async def _run_conflated(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            trades, self.latest = list(self.latest.values()), {}
+            await self.ws.send_text(json.dumps({"type": "trade", "data": trades}))
+            self.sent += 1
+            await asyncio.sleep(self.flush_interval)
 
 
 class FinnhubWSProxy:
-    """Maintains a single upstream Finnhub WebSocket, broadcasts trades to all connected clients."""
+    """Maintains a single upstream Finnhub WebSocket and routes trades to the clients subscribed to each symbol.
+
+    Subscriptions are reference-counted per symbol: the upstream subscribe is
+    sent when a symbol gets its first subscriber and the unsubscribe when it
+    loses its last one. Routing only enqueues; each client has its own writer
+    task, so a slow client never delays the upstream read or other clients.
+    When a client's queue is full, settings.market_ws_overflow_policy decides
+    whether to drop its oldest frame, conflate to the latest trade per symbol,
+    or disconnect it. Clients can instead opt into conflation mode, which
+    throttles them to one batched latest-per-symbol frame per interval.
 
-    def __init__(self):
-        self.clients: set = set()
+    Trades are annotated with dp, the day change against the previous close
+    held in quote_cache, and every trade updates that cache; a new subscriber
+    is sent a snapshot frame from it straight away.
+
+    A supervisor task owns the upstream connection: it reconnects with
+    jittered exponential backoff, replays the current subscriptions before
+    the connection is used, and stays up for settings.market_ws_idle_grace_seconds
+    after the last client leaves so page reloads reuse it.
+    """
+
+    def __init__(self, max_queue: int | None = None, policy: str | None = None):
+        self.max_queue = max_queue or settings.market_ws_queue_size
+        self.policy = policy or settings.market_ws_overflow_policy
+        if self.policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"market_ws_overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.clients: dict = {}  # ws -> _Client
+        self._subscribers: dict[str, set[_Client]] = {}  # symbol -> clients
         self._upstream = None
         self._task: asyncio.Task | None = None
-        self._symbols: set[str] = set()
+        self._idle_task: asyncio.Task | None = None
+        self._background: set[asyncio.Task] = set()
         self._lock = asyncio.Lock()
+        # Upstream connection state for monitoring
+        self.state = "idle"  # idle | connecting | connected | backoff
+        self.connects = 0
+        self.reconnects = 0
+        self.idle_closes = 0
+        self.last_error: str | None = None
+        self._connected_at: float | None = None
+        self._last_message_at: float | None = None
+        # Totals for clients that have already disconnected
+        self._sent_closed = 0
+        self._dropped_closed = 0
+        self._conflated_closed = 0
+        self.slow_disconnects = 0
+
+    def _spawn(self, coro):
+        """Run a fire-and-forget coroutine, holding a reference until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
 
-    async def add_client(self, ws):
-        self.clients.add(ws)
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"[finnhub_ws] background task failed: {task.exception()!r}")
 
-    def remove_client(self, ws):
-        self.clients.discard(ws)
+    async def add_client(self, ws, flush_hz: float | None = None):
+        """Register a client; with flush_hz it gets conflated frames at that rate instead of every trade."""
+        interval = 1 / min(flush_hz, settings.market_ws_max_flush_hz) if flush_hz else None
+        client = _Client(ws, self.max_queue, self.policy, interval)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients[ws] = client
+        if self._idle_task:
+            self._idle_task.cancel()
+            self._idle_task = None
+
+    async def _write(self, client: _Client):
+        try:
+            await client.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed: the client is gone
+            await self.remove_client(client.ws)
+
+    async def remove_client(self, ws):
+        async with self._lock:
+            client = self.clients.pop(ws, None)
+            if client is None:
+                return
+            if client.writer and client.writer is not asyncio.current_task():
+                client.writer.cancel()
+            self._sent_closed += client.sent
+            self._dropped_closed += client.dropped
+            self._conflated_closed += client.conflated
+            for symbol in client.symbols:
+                await self._release(client, symbol)
+            if not self.clients and self._task and not self._idle_task:
+                self._idle_task = asyncio.create_task(self._close_when_idle())
+
+    async def _close_when_idle(self):
+        """Close the upstream once no client has connected for the grace period."""
+        await asyncio.sleep(settings.market_ws_idle_grace_seconds)
+        self._idle_task = None
         if not self.clients and self._task:
             self._task.cancel()
             self._task = None
-            self._upstream = None
-            self._symbols.clear()
+            self.idle_closes += 1
+            print("[finnhub_ws] upstream closed after idle grace period")
 
-    async def subscribe(self, symbol: str):
+    async def _evict(self, ws):
+        """Disconnect a client that could not keep up."""
+        self.slow_disconnects += 1
+        await self.remove_client(ws)
+        try:
+            await ws.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def subscribe(self, ws, symbol: str):
         async with self._lock:
-            if symbol in self._symbols:
+            client = self.clients.get(ws)
+            if client is None or symbol in client.symbols:
+                return
+            client.symbols.add(symbol)
+            subscribers = self._subscribers.setdefault(symbol, set())
+            subscribers.add(client)
+            self._spawn(self._send_snapshot(client, symbol))
+            if len(subscribers) > 1:
                 return
-            self._symbols.add(symbol)
             if not self._task or self._task.done():
-                self._task = asyncio.create_task(self._run_upstream())
-            elif self._upstream:
-                try:
-                    await self._upstream.send(json.dumps({"type": "subscribe", "symbol": symbol}))
-                except Exception:
-                    pass
+                self._task = asyncio.create_task(self._supervise())
+            else:
+                await self._send_upstream("subscribe", symbol)
+
+    async def _send_snapshot(self, client: _Client, symbol: str):
+        """Give a new subscriber the last known price without waiting for the next trade."""
+        await quote_cache.ensure([symbol])
+        entries = quote_cache.snapshot([symbol])
+        if entries and symbol in client.symbols and self.clients.get(client.ws) is client:
+            client.push_snapshot(entries)
 
-    async def unsubscribe(self, symbol: str):
+    async def unsubscribe(self, ws, symbol: str):
         async with self._lock:
-            self._symbols.discard(symbol)
-            if self._upstream:
-                try:
-                    await self._upstream.send(json.dumps({"type": "unsubscribe", "symbol": symbol}))
-                except Exception:
-                    pass
+            client = self.clients.get(ws)
+            if client is None or symbol not in client.symbols:
+                return
+            client.symbols.discard(symbol)
+            client.traded.discard(symbol)
+            await self._release(client, symbol)
+
+    async def _release(self, client: _Client, symbol: str):
+        subscribers = self._subscribers.get(symbol)
+        if subscribers is None:
+            return
+        subscribers.discard(client)
+        if not subscribers:
+            del self._subscribers[symbol]
+            await self._send_upstream("unsubscribe", symbol)
+
+    async def _send_upstream(self, type: str, symbol: str):
+        if self._upstream:
+            try:
+                await self._upstream.send(json.dumps({"type": type, "symbol": symbol}))
+            except Exception:
+                pass
+
+    def _route(self, message: str):
+        """Split one upstream trade frame by symbol and enqueue each client's own symbols."""
+        try:
+            frame = json.loads(message)
+        except ValueError:
+            return
+        if frame.get("type") != "trade" or not frame.get("data"):
+            return
 
-    async def _run_upstream(self):
+        by_symbol: dict[str, list[dict]] = {}
+        for trade in frame["data"]:
+            if trade.get("s") in self._subscribers:
+                by_symbol.setdefault(trade["s"], []).append(trade)
+        if not by_symbol:
+            return
+        for symbol, trades in by_symbol.items():
+            for trade in trades:
+                trade["dp"] = quote_cache.change_pct(symbol, trade["p"])
+            quote_cache.record_trade(symbol, trades[-1]["p"], trades[-1].get("t"))
+
+        per_client: dict[_Client, list[str]] = {}
+        for symbol in by_symbol:
+            for client in self._subscribers[symbol]:
+                per_client.setdefault(client, []).append(symbol)
+        # Clients with the same matching symbols share one serialized frame
+        encoded: dict[tuple[str, ...], tuple[str, list[dict]]] = {}
+        for client, symbols in per_client.items():
+            if client.flush_interval:
+                for symbol in symbols:
+                    client.conflate(symbol, by_symbol[symbol])
+                continue
+            client.traded.update(symbols)
+            key = tuple(symbols)
+            if key not in encoded:
+                trades = [t for s in symbols for t in by_symbol[s]]
+                encoded[key] = (json.dumps({"type": "trade", "data": trades}), trades)
+            if not client.push(*encoded[key]):
+                self._spawn(self._evict(client.ws))
+
+    async def _supervise(self):
+        """Keep the upstream connected until cancelled, backing off between failed attempts."""
         uri = f"wss://ws.finnhub.io?token={settings.finnhub_api_key}"
+        attempt = 0
         try:
-            async with websockets.connect(uri) as ws:
-                self._upstream = ws
-                for symbol in self._symbols:
-                    await ws.send(json.dumps({"type": "subscribe", "symbol": symbol}))
-
-                async for message in ws:
-                    dead = []
-                    for client in self.clients:
-                        try:
-                            await client.send_text(message)
-                        except Exception:
-                            dead.append(client)
-                    for d in dead:
-                        self.clients.discard(d)
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print(f"Finnhub upstream WS error: {e}")
-            if self.clients:
-                await asyncio.sleep(5)
-                self._task = asyncio.create_task(self._run_upstream())
+            while True:
+                self.state = "connecting"
+                try:
+                    async with websockets.connect(
+                        uri, ping_interval=PING_INTERVAL_SECONDS, ping_timeout=PING_TIMEOUT_SECONDS,
+                    ) as ws:
+                        await self._resubscribe(ws)
+                        await self._read(ws)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    print(f"[finnhub_ws] upstream error: {self.last_error}")
+                finally:
+                    self._upstream = None
+
+                if self._connected_at and time.monotonic() - self._connected_at >= STABLE_CONNECTION_SECONDS:
+                    attempt = 0
+                self._connected_at = None
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                attempt += 1
+                self.reconnects += 1
+                self.state = "backoff"
+                await asyncio.sleep(delay)
         finally:
+            self.state = "idle"
             self._upstream = None
+            self._connected_at = None
+
+    async def _resubscribe(self, ws):
+        """Replay every subscribed symbol before the connection is published.
+
+        Holding the lock means a concurrent subscribe either lands in this
+        replay or is sent afterwards on the live connection, never lost.
+        """
+        async with self._lock:
+            for symbol in list(self._subscribers):
+                await ws.send(json.dumps({"type": "subscribe", "symbol": symbol}))
+            self._upstream = ws
+        self.state = "connected"
+        self.connects += 1
+        self._connected_at = self._last_message_at = time.monotonic()
+        print(f"[finnhub_ws] upstream connected, {len(self._subscribers)} symbols subscribed")
+
+    async def _read(self, ws):
+        while True:
+            try:
+                message = await asyncio.wait_for(ws.recv(), HEARTBEAT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"no upstream message for {HEARTBEAT_TIMEOUT_SECONDS:.0f}s")
+            self._last_message_at = time.monotonic()
+            self._route(message)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        depths = [len(c.queue) for c in self.clients.values()]
+        return {
+            "clients": len(self.clients),
+            "symbols": len(self._subscribers),
+            "conflated_clients": sum(1 for c in self.clients.values() if c.flush_interval),
+            "overflow_policy": self.policy,
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "frames_sent": self._sent_closed + sum(c.sent for c in self.clients.values()),
+            "trades_dropped": self._dropped_closed + sum(c.dropped for c in self.clients.values()),
+            "trades_conflated": self._conflated_closed + sum(c.conflated for c in self.clients.values()),
+            "slow_disconnects": self.slow_disconnects,
+            "upstream": {
+                "state": self.state,
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+                "idle_closes": self.idle_closes,
+                "connected_seconds": round(now - self._connected_at) if self._connected_at else None,
+                "last_message_age_seconds": round(now - self._last_message_at, 1)
+                if self._connected_at and self._last_message_at else None,
+                "last_error": self.last_error,
+            },
+        }
 
 
 finnhub_proxy = FinnhubWSProxy()
@@ -4,16 +4,43 @@ from app.db import supabase as db
 
 
 async def process_gauge_decay():
-    """Run gauge decay for all users with favorites."""
+    """Run gauge decay for all users with favorites.
+
+    Loads the decay window's articles (with sectors and quizzes), the attempts
+    on those quizzes and all favorites once, computes every pending count in
+    memory and writes the changed gauges in bulk.
+    """
     all_favorites = await db.get_all_favorites_with_users()
+    if not all_favorites:
+        return
 
+    # Articles older than 30 min from the last 24h, grouped by sector
+    cutoff = (datetime.utcnow() - timedelta(minutes=30)).isoformat()
+    day_ago = (datetime.utcnow() - timedelta(hours=24)).isoformat()
+    articles = await db.get_done_articles_with_quizzes(day_ago, cutoff)
+
+    sector_articles: dict[int, int] = {}
+    sector_quizzes: dict[int, set[int]] = {}
+    for article in articles:
+        quiz_ids = {q["id"] for q in article.get("quizzes") or []}
+        for s in article.get("article_sectors") or []:
+            sid = s["sector_id"]
+            sector_articles[sid] = sector_articles.get(sid, 0) + 1
+            sector_quizzes.setdefault(sid, set()).update(quiz_ids)
+
+    all_quiz_ids = sorted(set().union(*sector_quizzes.values())) if sector_quizzes else []
+    completed: dict[str, set[int]] = {}
+    for attempt in await db.get_quiz_attempt_pairs(all_quiz_ids):
+        completed.setdefault(attempt["user_id"], set()).add(attempt["quiz_id"])
+
+    weekend = datetime.utcnow().weekday() >= 5
+    updates = []
     for fav in all_favorites:
-        user_id = fav["user_id"]
-        sector_id = fav["sector_id"]
-        current_score = fav["gauge_score"]
-
-        # Count unread articles older than 30 min in this sector
-        pending = await _count_pending_articles(user_id, sector_id)
+        pending = _count_pending_articles(
+            sector_articles.get(fav["sector_id"], 0),
+            sector_quizzes.get(fav["sector_id"], set()),
+            completed.get(fav["user_id"], set()),
+        )
         if pending >= 6:
             decay = 15
         elif pending >= 4:
@@ -24,52 +51,25 @@ async def process_gauge_decay():
             decay = 0
 
         # Weekend modifier
-        if datetime.utcnow().weekday() >= 5:
+        if weekend:
             decay = decay // 2
 
         if decay > 0:
-            new_score = max(current_score - decay, 20)  # Floor at 20
-            await db.update_gauge(user_id, sector_id, new_score)
+            new_score = max(fav["gauge_score"] - decay, 20)  # Floor at 20
+            updates.append({"user_id": fav["user_id"], "sector_id": fav["sector_id"], "gauge_score": new_score})
 
+    await db.update_gauges(updates)
+    if updates:
+        print(f"Gauge decay: updated {len(updates)} of {len(all_favorites)} gauges")
 
-async def _count_pending_articles(user_id: str, sector_id: int) -> int:
-    """Count articles in sector that user hasn't quizzed on, older than 30 min."""
-    from app.dependencies import supabase
-
-    cutoff = (datetime.utcnow() - timedelta(minutes=30)).isoformat()
-    day_ago = (datetime.utcnow() - timedelta(hours=24)).isoformat()
 
-    # Filter at DB level: only articles from last 24h, older than 30 min
-    articles = supabase.table("articles").select(
-        "id"
-    ).eq("processing_status", "done").lt(
-        "created_at", cutoff
-    ).gt(
-        "created_at", day_ago
-    ).in_(
-        "id",
-        [r["article_id"] for r in supabase.table("article_sectors").select("article_id").eq("sector_id", sector_id).execute().data]
-    ).execute()
-
-    if not articles.data:
+def _count_pending_articles(article_count: int, quiz_ids: set[int], completed_quiz_ids: set[int]) -> int:
+    """Count articles in a sector the user hasn't quizzed on (capped at 6)."""
+    if not article_count:
         return 0
-
-    article_ids = [a["id"] for a in articles.data]
-
-    # Check which ones user has already quizzed on
-    quizzes = supabase.table("quizzes").select("id, article_id").in_("article_id", article_ids).execute()
-    quiz_ids = [q["id"] for q in quizzes.data]
-
     if not quiz_ids:
-        return min(len(article_ids), 6)
-
-    attempts = supabase.table("quiz_attempts").select("quiz_id").eq(
-        "user_id", user_id
-    ).in_("quiz_id", quiz_ids).execute()
-
-    completed_quiz_ids = {a["quiz_id"] for a in attempts.data}
-    pending_count = sum(1 for q in quizzes.data if q["id"] not in completed_quiz_ids)
-    return min(pending_count, 6)
+        return min(article_count, 6)
+    return min(len(quiz_ids - completed_quiz_ids), 6)
 
 
 async def calculate_gauge_gain(score: int, total: int) -> int:
@@ -0,0 +1,301 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from sortedcontainers import SortedList
+
+from app.db import supabase as db
+from app.db.reference import reference_data
+
+TOP_N = 20
+PERIODS = ("all_time", "weekly", "monthly")
+FRIENDS_TTL_SECONDS = 60
+FRIENDS_MAX_ENTRIES = 10_000
+# After a failed seed, reads fall back to the views and a new seed is not
+# attempted (in the background) before this many seconds have passed
+SEED_RETRY_SECONDS = 60
+
+
+class RankedBoard:
+    """XP scores for one leaderboard, ordered for O(log n) rank and top-N lookups.
+
+    Ranks use RANK() semantics like the materialized views: tied users share a
+    rank and the next rank skips accordingly.
+    """
+
+    def __init__(self):
+        self._xp: dict[str, int] = {}
+        self._order = SortedList()  # (-xp, user_id)
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    def set(self, user_id: str, xp: int):
+        old = self._xp.pop(user_id, None)
+        if old is not None:
+            self._order.remove((-old, user_id))
+        if xp > 0:
+            self._xp[user_id] = xp
+            self._order.add((-xp, user_id))
+
+    def add(self, user_id: str, delta: int):
+        self.set(user_id, self._xp.get(user_id, 0) + delta)
+
+    def xp(self, user_id: str) -> int:
+        return self._xp.get(user_id, 0)
+
+    def rank(self, user_id: str) -> int | None:
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        # "" sorts before every user id, so this counts users with strictly more XP
+        return self._order.bisect_left((-xp, "")) + 1
+
+    def top(self, n: int) -> list[tuple[str, int, int]]:
+        """[(user_id, xp, rank)] for the first n entries."""
+        out = []
+        rank = 0
+        prev_xp = None
+        for i, (neg_xp, user_id) in enumerate(self._order.islice(0, n)):
+            if -neg_xp != prev_xp:
+                rank, prev_xp = i + 1, -neg_xp
+            out.append((user_id, -neg_xp, rank))
+        return out
+
+
+class LeaderboardEngine:
+    """In-process global, weekly, monthly and per-sector leaderboards.
+
+    Seeded from the materialized views, then updated as XP is granted
+    (db.grant_xp, db.submit_quiz_attempt, db.settle_predictions) so reads are
+    fresh between view refreshes. The startup warm-up and the hourly job
+    refresh the views and reseed, which also ages quiz XP out of the
+    weekly/monthly windows; writes recorded while a seed is in flight are
+    replayed onto the new boards.
+    """
+
+    def __init__(self):
+        self._boards: dict[str, RankedBoard] = {p: RankedBoard() for p in PERIODS}
+        self._sectors: dict[int, RankedBoard] = {}
+        self._profiles: dict[str, dict] = {}
+        # (user_id, period) -> (rows, built_at)
+        self._friends: OrderedDict[tuple[str, str], tuple[list[dict], float]] = OrderedDict()
+        self.seeded = False
+        self._replay: list[tuple] | None = None
+        self._seed_task: asyncio.Task | None = None
+        self._retry_at = 0.0
+        self._seed_lock = asyncio.Lock()
+
+    async def seed(self, refresh: bool = True):
+        """Rebuild every board from the materialized views, refreshing them first unless told not to."""
+        async with self._seed_lock:
+            self._replay = []
+            try:
+                if refresh:
+                    await db.refresh_leaderboards()
+                await self._load()
+            finally:
+                self._replay = None
+
+    async def _load(self):
+        global_rows, weekly_rows, monthly_rows, sector_rows = await asyncio.gather(
+            db.fetch_leaderboard_view("leaderboard_global", "user_id, username, avatar_url, total_xp"),
+            db.fetch_leaderboard_view("leaderboard_weekly", "user_id, username, avatar_url, xp"),
+            db.fetch_leaderboard_view("leaderboard_monthly", "user_id, username, avatar_url, xp"),
+            db.fetch_leaderboard_view(
+                "leaderboard_sector", "user_id, sector_id, username, avatar_url, sector_xp",
+                order=("user_id", "sector_id"),
+            ),
+        )
+        boards = {p: RankedBoard() for p in PERIODS}
+        sectors: dict[int, RankedBoard] = {}
+        profiles: dict[str, dict] = {}
+        for period, rows, column in (
+            ("all_time", global_rows, "total_xp"),
+            ("weekly", weekly_rows, "xp"),
+            ("monthly", monthly_rows, "xp"),
+        ):
+            for r in rows:
+                boards[period].set(r["user_id"], r[column])
+                profiles[r["user_id"]] = {"username": r["username"], "avatar_url": r["avatar_url"]}
+        for r in sector_rows:
+            sectors.setdefault(r["sector_id"], RankedBoard()).set(r["user_id"], r["sector_xp"])
+            profiles[r["user_id"]] = {"username": r["username"], "avatar_url": r["avatar_url"]}
+
+        # XP granted after the views were refreshed isn't in them yet
+        for apply, *args in self._replay:
+            apply(boards, sectors, *args)
+
+        self._boards, self._sectors, self._profiles = boards, sectors, profiles
+        self.seeded = True
+        print(f"[leaderboard] seeded {len(boards['all_time'])} users, {len(sectors)} sector boards")
+
+    async def warm(self):
+        """Initial seed; on failure the next attempt waits SEED_RETRY_SECONDS."""
+        try:
+            await self.seed()
+        except Exception as e:
+            self._retry_at = time.monotonic() + SEED_RETRY_SECONDS
+            print(f"[leaderboard] seed failed: {e}")
+        finally:
+            self._seed_task = None
+
+    def _ensure_seeded(self) -> bool:
+        """Whether reads can use the boards. Never seeds on the request path: a
+        missing seed is (re)started in the background, rate-limited."""
+        idle = self._seed_task is None and not self._seed_lock.locked()
+        if not self.seeded and idle and time.monotonic() >= self._retry_at:
+            self._seed_task = asyncio.create_task(self.warm())
+        return self.seeded
+
+    # --- Writes ---
+
+    @staticmethod
+    def _apply_xp(boards: dict[str, RankedBoard], sectors: dict[int, RankedBoard], grants: dict[str, int]):
+        for user_id, amount in grants.items():
+            boards["all_time"].add(user_id, amount)
+
+    @staticmethod
+    def _apply_quiz(boards: dict[str, RankedBoard], sectors: dict[int, RankedBoard],
+                    user_id: str, xp: int, sector_ids: list[int]):
+        for board in boards.values():
+            board.add(user_id, xp)
+        for sid in sector_ids:
+            sectors.setdefault(sid, RankedBoard()).add(user_id, xp)
+
+    def record_xp(self, grants: dict[str, int]):
+        """XP added to profiles.total_xp (passive XP, predictions, daily quiz)."""
+        if self._replay is not None:
+            self._replay.append((self._apply_xp, grants))
+        if self.seeded:
+            self._apply_xp(self._boards, self._sectors, grants)
+
+    def record_quiz(self, user_id: str, xp: int, sector_ids: list[int]):
+        """Article quiz XP counts toward every board, including the article's sectors."""
+        if xp <= 0:
+            return
+        if self._replay is not None:
+            self._replay.append((self._apply_quiz, user_id, xp, sector_ids))
+        if self.seeded:
+            self._apply_quiz(self._boards, self._sectors, user_id, xp, sector_ids)
+
+    def update_profile(self, user_id: str, username: str | None, avatar_url: str | None):
+        if user_id in self._profiles:
+            self._profiles[user_id] = {"username": username, "avatar_url": avatar_url}
+
+    # --- Reads ---
+
+    async def _profiles_for(self, user_ids: list[str]) -> dict[str, dict]:
+        missing = [uid for uid in user_ids if uid not in self._profiles]
+        if missing:
+            for p in await db.get_profiles_brief(missing):
+                self._profiles[p["id"]] = {"username": p["username"], "avatar_url": p["avatar_url"]}
+        return {uid: self._profiles.get(uid, {"username": None, "avatar_url": None}) for uid in user_ids}
+
+    async def top(self, period: str = "all_time", n: int = TOP_N) -> list[dict] | None:
+        """Top-n rows shaped like the matching view, or None if the engine isn't available."""
+        if not self._ensure_seeded():
+            return None
+        entries = self._boards[period].top(n)
+        profiles = await self._profiles_for([uid for uid, _, _ in entries])
+        xp_column = "total_xp" if period == "all_time" else "xp"
+        return [
+            {"user_id": uid, **profiles[uid], xp_column: xp, "rank": rank}
+            for uid, xp, rank in entries
+        ]
+
+    async def sector_top(self, sector_id: int, n: int = TOP_N) -> list[dict] | None:
+        if not self._ensure_seeded():
+            return None
+        board = self._sectors.get(sector_id)
+        entries = board.top(n) if board else []
+        profiles = await self._profiles_for([uid for uid, _, _ in entries])
+        return [
+            {"user_id": uid, "sector_id": sector_id, **profiles[uid], "sector_xp": xp, "rank": rank}
+            for uid, xp, rank in entries
+        ]
+
+    async def user_rank(self, user_id: str) -> dict | None:
+        """The user's global row ({user_id, username, avatar_url, total_xp, rank}), or None."""
+        if not self._ensure_seeded():
+            return await db.get_user_rank(user_id)
+        board = self._boards["all_time"]
+        rank = board.rank(user_id)
+        if rank is None:
+            return None
+        profiles = await self._profiles_for([user_id])
+        return {"user_id": user_id, **profiles[user_id], "total_xp": board.xp(user_id), "rank": rank}
+
+    def _top_sector(self, user_id: str) -> tuple[int | None, int | None]:
+        """(sector_id, % of the user's sector XP) for the user's strongest sector."""
+        best, best_xp, total = None, 0, 0
+        for sid, board in self._sectors.items():
+            xp = board.xp(user_id)
+            total += xp
+            if xp > best_xp:
+                best, best_xp = sid, xp
+        if best is None:
+            return None, None
+        return best, round(best_xp * 100 / total)
+
+    async def _build_friends(self, user_ids: list[str], period: str) -> list[dict]:
+        board = self._boards[period]
+        scored = sorted(
+            ((uid, board.xp(uid)) for uid in user_ids if board.xp(uid) > 0),
+            key=lambda e: e[1], reverse=True,
+        )
+        profiles = await self._profiles_for([uid for uid, _ in scored])
+        sector_map = await reference_data.sector_map()
+        xp_column = "total_xp" if period == "all_time" else "xp"
+        rows = []
+        for i, (uid, xp) in enumerate(scored):
+            sid, pct = self._top_sector(uid)
+            sector = sector_map.get(sid, {})
+            rows.append({
+                "user_id": uid, **profiles[uid], xp_column: xp, "rank": i + 1,
+                "fav_sector": sector.get("name"),
+                "fav_sector_slug": sector.get("slug"),
+                "fav_sector_pct": pct if sector else None,
+            })
+        return rows
+
+    async def friends(self, user_id: str, period: str = "all_time") -> list[dict]:
+        """The user and their friends ranked by period XP, with each one's favourite sector.
+
+        Results are cached per user for FRIENDS_TTL_SECONDS. Built from the
+        in-memory boards when seeded, otherwise from one friends_leaderboard RPC.
+        """
+        key = (user_id, period)
+        cached = self._friends.get(key)
+        if cached and time.monotonic() - cached[1] < FRIENDS_TTL_SECONDS:
+            self._friends.move_to_end(key)
+            return cached[0]
+
+        user_ids = [user_id] + await db.get_friend_ids(user_id)
+        if self._ensure_seeded():
+            rows = await self._build_friends(user_ids, period)
+        else:
+            rows = await db.get_friends_leaderboard(user_ids, period)
+
+        self._friends[key] = (rows, time.monotonic())
+        self._friends.move_to_end(key)
+        if len(self._friends) > FRIENDS_MAX_ENTRIES:
+            self._friends.popitem(last=False)
+        return rows
+
+    def invalidate_friends(self, *user_ids: str):
+        """Drop cached friends boards after a friendship is added or removed."""
+        for uid in user_ids:
+            for period in PERIODS:
+                self._friends.pop((uid, period), None)
+
+    def stats(self) -> dict:
+        return {
+            "seeded": self.seeded,
+            "users": len(self._boards["all_time"]),
+            "sector_boards": len(self._sectors),
+            "friends_cached": len(self._friends),
+        }
+
+
+leaderboard = LeaderboardEngine()
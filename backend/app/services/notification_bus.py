@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from app.db.unread_counts import unread_counts
+
+PUSH_INTERVAL_SECONDS = 2.0
+MAX_LATEST = 5
+SUBSCRIBER_QUEUE_SIZE = 8
+
+
+class NotificationBus:
+    """In-process per-user pub/sub for notification pushes.
+
+    publish() only records new rows for users with an open connection; each
+    user then gets at most one event per PUSH_INTERVAL_SECONDS with how many
+    notifications arrived, the newest few rows and the unread count. Only this
+    process's writes are seen — publish()/subscribe() is the surface a
+    Postgres LISTEN/NOTIFY backend would implement for multiple instances.
+    """
+
+    def __init__(self, interval_seconds: float = PUSH_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._pending: dict[str, list[dict]] = {}
+        self._scheduled: dict[str, asyncio.Task] = {}
+        self._last_push: dict[str, float] = {}
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+            self._pending.pop(user_id, None)
+            self._last_push.pop(user_id, None)
+            task = self._scheduled.pop(user_id, None)
+            if task:
+                task.cancel()
+
+    def publish(self, user_id: str, rows: list[dict]):
+        """Queue newly inserted notification rows for a coalesced push."""
+        if user_id not in self._subscribers or not rows:
+            return
+        self._pending.setdefault(user_id, []).extend(rows)
+        if user_id not in self._scheduled:
+            wait = self._last_push.get(user_id, 0) + self.interval_seconds - time.monotonic()
+            self._scheduled[user_id] = asyncio.create_task(self._flush(user_id, max(0.0, wait)))
+
+    def publish_rows(self, rows: list[dict]):
+        """publish() a batch of rows spanning many users."""
+        by_user: dict[str, list[dict]] = {}
+        for row in rows:
+            by_user.setdefault(row["user_id"], []).append(row)
+        for user_id, user_rows in by_user.items():
+            self.publish(user_id, user_rows)
+
+    async def _flush(self, user_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+            self._last_push[user_id] = time.monotonic()
+            rows = self._pending.pop(user_id, [])
+            unread = await unread_counts.get(user_id)
+            event = {
+                "type": "notifications",
+                "new_count": len(rows),
+                "latest": rows[-MAX_LATEST:][::-1],
+                "unread_count": unread,
+            }
+            for queue in self._subscribers.get(user_id, ()):
+                if queue.full():
+                    # Slow consumer: the newest event supersedes the oldest
+                    queue.get_nowait()
+                queue.put_nowait(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[notification_bus] push failed for {user_id}: {e}")
+        finally:
+            self._scheduled.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(q) for q in self._subscribers.values()),
+            "pending_pushes": len(self._scheduled),
+        }
+
+
+notification_bus = NotificationBus()
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from app.config import settings
+from app.db import supabase as db
+from app.db.reference import reference_data
+from app.services.notification_bus import notification_bus
+
+SUBSCRIBER_TTL_SECONDS = 10 * 60
+
+
+class SectorSubscribers:
+    """In-process sector_id -> {user_id} index over user_favorites.
+
+    Loaded on first use and reloaded after the TTL; the favorites router
+    writes through add()/remove() so changes show up immediately.
+    """
+
+    def __init__(self, ttl_seconds: float = SUBSCRIBER_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._by_sector: dict[int, set[str]] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def refresh(self):
+        by_sector: dict[int, set[str]] = {}
+        for fav in await db.get_favorite_pairs():
+            by_sector.setdefault(fav["sector_id"], set()).add(fav["user_id"])
+        self._by_sector = by_sector
+        self._loaded_at = time.monotonic()
+
+    def add(self, user_id: str, sector_id: int):
+        self._by_sector.setdefault(sector_id, set()).add(user_id)
+
+    def remove(self, user_id: str, sector_id: int):
+        self._by_sector.get(sector_id, set()).discard(user_id)
+
+    async def subscribers(self, sector_id: int) -> set[str]:
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self.refresh()
+        return self._by_sector.get(sector_id, set())
+
+
+sector_subscribers = SectorSubscribers()
+
+
+def _article_row(user_id: str, article: dict, sector_names: list[str]) -> dict:
+    sector_label = ", ".join(sector_names[:3]) if sector_names else "your sector"
+    return {
+        "user_id": user_id,
+        "type": "new_article",
+        "title": f"New in {sector_label}",
+        "body": article["headline"][:200],
+        "link": f"/article/{article['id']}",
+    }
+
+
+def _sector_digest_row(user_id: str, sector_name: str, articles: list[dict]) -> dict:
+    if len(articles) == 1:
+        return _article_row(user_id, articles[0], [sector_name])
+    return {
+        "user_id": user_id,
+        "type": "new_article",
+        "title": f"{len(articles)} new articles in {sector_name}",
+        "body": articles[-1]["headline"][:200],
+        "link": "/feed",
+    }
+
+
+async def notify_new_articles(articles: list[dict]) -> int:
+    """Notify subscribers about a batch of processed articles. Returns rows written.
+
+    Each article is {"id", "headline", "sector_ids"}. A user who would get more
+    than settings.notification_coalesce_threshold notifications from the batch
+    gets one per sector instead ("5 new articles in Crypto").
+    """
+    sector_map = await reference_data.sector_map()
+
+    # user_id -> [(article, matched sector ids)]
+    per_user: dict[str, list[tuple[dict, list[int]]]] = {}
+    for article in articles:
+        matched: dict[str, list[int]] = {}
+        for sid in article["sector_ids"]:
+            for uid in await sector_subscribers.subscribers(sid):
+                matched.setdefault(uid, []).append(sid)
+        for uid, sids in matched.items():
+            per_user.setdefault(uid, []).append((article, sids))
+
+    rows = []
+    for uid, items in per_user.items():
+        if len(items) <= settings.notification_coalesce_threshold:
+            for article, sids in items:
+                names = [sector_map[sid]["name"] for sid in sids if sid in sector_map]
+                rows.append(_article_row(uid, article, names))
+            continue
+
+        # Coalesce: count each article once, under its first matching sector
+        by_sector: dict[int, list[dict]] = {}
+        for article, sids in items:
+            by_sector.setdefault(sids[0], []).append(article)
+        for sid, grouped in by_sector.items():
+            name = sector_map[sid]["name"] if sid in sector_map else "your sector"
+            rows.append(_sector_digest_row(uid, name, grouped))
+
+    stored = await db.insert_notifications(rows)
+    notification_bus.publish_rows(stored)
+    return len(stored)
+
+
+async def send_notification(user_id: str, type: str, title: str, body: str, link: str | None = None):
+    """Store a single notification and push it to the user's open connections."""
+    row = await db.insert_notification(user_id, type, title, body, link)
+    notification_bus.publish(user_id, [row])
@@ -5,6 +5,8 @@ import httpx
 
 from app.db import supabase as db
 from app.services import finnhub, gnews, rss_feeds, scraper, llm
+from app.services.notifications import notify_new_articles
+from app.services.recent_articles import recent_articles
 
 # Query params to strip for URL normalization (tracking/analytics)
 _STRIP_PARAMS = {"utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
@@ -64,6 +66,22 @@ def _source_from_domain(url: str) -> str | None:
     return None
 
 
+async def _insert_new_articles(rows: list[dict]) -> tuple[list[dict], list[int]]:
+    """Deduplicate rows against the recent-article index and the DB, then bulk insert.
+
+    Returns the inserted rows and their new IDs, in the same order.
+    """
+    fresh, unsure = recent_articles.partition(rows)
+    checked = await db.filter_new_articles(unsure)
+    # Rows the DB already has are recorded too, so the next cycle rejects them locally
+    checked_ids = {id(row) for row in checked}
+    recent_articles.add([row for row in unsure if id(row) not in checked_ids])
+
+    new_rows, article_ids = await db.insert_articles(fresh + checked)
+    recent_articles.add(new_rows)
+    return new_rows, article_ids
+
+
 async def resolve_url(url: str) -> tuple[str, str | None]:
     """Follow redirects and return (final_url, source_name_or_None)."""
     try:
@@ -78,68 +96,78 @@ async def resolve_url(url: str) -> tuple[str, str | None]:
 async def ingest_finnhub():
     """Full Finnhub ingestion cycle: fetch news, deduplicate, save."""
     articles = await finnhub.fetch_all_news()
-    saved_count = 0
 
+    rows = []
+    tickers_by_id: dict[str, list[str]] = {}
     for article in articles:
-        normalized = _normalize_url(article.get("original_url", ""))
-        if await db.article_exists(finnhub_id=article.get("finnhub_id"), original_url=normalized):
-            continue
-
-        article_id = await db.insert_article({
-            "finnhub_id": article.get("finnhub_id"),
+        finnhub_id = article.get("finnhub_id")
+        rows.append({
+            "finnhub_id": finnhub_id,
             "source_name": article.get("source_name", ""),
             "headline": article.get("headline", ""),
             "snippet": article.get("snippet"),
-            "original_url": normalized,
+            "original_url": _normalize_url(article.get("original_url", "")),
             "image_url": article.get("image_url"),
             "published_at": article.get("published_at"),
             "processing_status": "pending",
         })
-
-        # Fetch and attach ticker quotes if available
-        tickers = article.get("tickers", [])
-        if tickers:
-            quotes = await finnhub.fetch_quotes_for_tickers(tickers)
-            if quotes:
-                await db.insert_article_tickers(article_id, quotes)
-
-        saved_count += 1
-
-    print(f"Finnhub ingestion: {saved_count} new articles saved")
-    return saved_count
+        # The same story can come back for several tickers — keep them all
+        ticker_list = tickers_by_id.setdefault(finnhub_id, [])
+        ticker_list.extend(t for t in article.get("tickers", []) if t not in ticker_list)
+
+    new_rows, article_ids = await _insert_new_articles(rows)
+
+    # Fetch each ticker's quote once and attach it to every new article that mentions it
+    new_tickers = {
+        article_id: tickers_by_id.get(row["finnhub_id"], [])
+        for article_id, row in zip(article_ids, new_rows)
+    }
+    distinct = sorted({t for tickers in new_tickers.values() for t in tickers})
+    if distinct:
+        quotes = {q["ticker"]: q for q in await finnhub.fetch_quotes_for_tickers(distinct)}
+        await db.insert_article_ticker_rows([
+            {"article_id": article_id, **quotes[t]}
+            for article_id, tickers in new_tickers.items()
+            for t in tickers
+            if t in quotes
+        ])
+
+    print(f"Finnhub ingestion: {len(article_ids)} new articles saved")
+    return len(article_ids)
 
 
 async def _ingest_gnews_articles(articles: list[dict], label: str) -> int:
     """Shared GNews ingestion logic for both regions and markets."""
-    saved_count = 0
-
+    rows = []
+    regions = []
     for article in articles:
-        normalized = _normalize_url(article.get("original_url", ""))
-        if await db.article_exists(original_url=normalized):
-            continue
-
-        region = article.pop("region", None)
-        article_id = await db.insert_article({
+        rows.append({
             "gnews_url": article.get("gnews_url"),
             "source_name": article.get("source_name", ""),
             "headline": article.get("headline", ""),
             "snippet": article.get("snippet"),
-            "original_url": normalized,
+            "original_url": _normalize_url(article.get("original_url", "")),
             "image_url": article.get("image_url"),
             "published_at": article.get("published_at"),
             "processing_status": "pending",
         })
+        regions.append(article.get("region"))
 
-        # Map region/market slug to sector
-        if region:
-            sector = await db.get_sector_by_slug(region)
-            if sector:
-                await db.insert_article_sectors(article_id, [sector["id"]])
+    # Deduplication returns the same dict objects, so map them back to their region
+    region_by_row = {id(row): region for row, region in zip(rows, regions)}
+    new_rows, article_ids = await _insert_new_articles(rows)
 
-        saved_count += 1
+    # Map region/market slug to sector
+    if article_ids:
+        sector_ids = {s["slug"]: s["id"] for s in await db.get_all_sectors()}
+        await db.insert_article_sector_rows([
+            {"article_id": article_id, "sector_id": sector_ids[region_by_row[id(row)]]}
+            for article_id, row in zip(article_ids, new_rows)
+            if region_by_row[id(row)] in sector_ids
+        ])
 
-    print(f"GNews {label}: {saved_count} new articles saved")
-    return saved_count
+    print(f"GNews {label}: {len(article_ids)} new articles saved")
+    return len(article_ids)
 
 
 async def ingest_gnews_regions():
@@ -163,27 +191,23 @@ async def ingest_gnews():
 async def ingest_rss():
     """Full RSS ingestion cycle: fetch all feeds, deduplicate, save."""
     articles = await rss_feeds.fetch_all_rss_feeds()
-    saved_count = 0
-
-    for article in articles:
-        normalized = _normalize_url(article.get("original_url", ""))
-        if await db.article_exists(original_url=normalized):
-            continue
 
-        await db.insert_article({
+    rows = [
+        {
             "source_name": article.get("source_name", ""),
             "headline": article.get("headline", ""),
             "snippet": article.get("snippet"),
-            "original_url": normalized,
+            "original_url": _normalize_url(article.get("original_url", "")),
             "image_url": article.get("image_url"),
             "published_at": article.get("published_at"),
             "processing_status": "pending",
-        })
-
-        saved_count += 1
+        }
+        for article in articles
+    ]
+    new_rows, article_ids = await _insert_new_articles(rows)
 
-    print(f"RSS ingestion: {saved_count} new articles saved")
-    return saved_count
+    print(f"RSS ingestion: {len(article_ids)} new articles saved")
+    return len(article_ids)
 
 
 MAX_RETRIES = 3
@@ -197,7 +221,7 @@ async def recover_stuck_articles():
     cutoff = (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat()
 
     for status in ("scraping", "generating"):
-        stuck, _ = await db.get_articles(status=status, page=1, limit=50)
+        stuck, _ = await db.get_articles(status=status, page=1, limit=50, columns=db.ARTICLE_STATUS)
         recovered = 0
         failed = 0
         for article in stuck:
@@ -222,18 +246,43 @@ async def recover_stuck_articles():
             print(f"Permanently failed {failed} articles stuck in '{status}' (exceeded {MAX_RETRIES} retries)")
 
 
-async def _process_single_article(article: dict) -> bool:
-    """Process a single article. Returns True on success, False on failure."""
+class _ArticleWrites:
+    """Accumulates field changes for one article and writes them once per status transition.
+
+    Only scraping/generating need to hit the database as soon as they happen,
+    since recover_stuck_articles relies on them; everything else rides along
+    with the next transition.
+    """
+
+    def __init__(self, article_id: int):
+        self.article_id = article_id
+        self._pending: dict = {}
+
+    def set(self, **fields):
+        self._pending.update(fields)
+
+    async def transition(self, status: str):
+        self._pending["processing_status"] = status
+        data, self._pending = self._pending, {}
+        await db.update_article(self.article_id, data)
+
+
+async def _process_single_article(article: dict, processed: list[dict]) -> bool:
+    """Process a single article. Returns True on success, False on failure.
+
+    Successful articles are appended to `processed` for the notification fan-out.
+    """
     article_id = article["id"]
+    writes = _ArticleWrites(article_id)
     try:
         existing_content = article.get("raw_content")
 
         # Step 1: Scrape — skip if article already has content (retry of LLM-failed article)
         if existing_content and len(existing_content) >= 20:
             raw_text = existing_content
-            await db.update_article(article_id, {"processing_status": "generating"})
+            await writes.transition("generating")
         else:
-            await db.update_article(article_id, {"processing_status": "scraping"})
+            await writes.transition("scraping")
             scraped = await scraper.scrape_article(article["original_url"])
 
             raw_text = scraped.get("text", "") if scraped else ""
@@ -244,18 +293,18 @@ async def _process_single_article(article: dict) -> bool:
             # Update URL and source name if redirect resolved to a different domain
             if final_url and final_url != article["original_url"]:
                 real_source = _source_from_domain(final_url)
-                updates = {"original_url": final_url}
+                writes.set(original_url=final_url)
                 if real_source:
-                    updates["source_name"] = real_source
-                await db.update_article(article_id, updates)
+                    writes.set(source_name=real_source)
+                recent_articles.add([{"original_url": final_url}])
 
             # Update image if we got a better one from og:image
             if og_image and og_image != article.get("image_url"):
-                await db.update_article(article_id, {"image_url": og_image})
+                writes.set(image_url=og_image)
 
             # Skip articles with no image at all
             if not og_image and not article.get("image_url"):
-                await db.update_article(article_id, {"processing_status": "failed"})
+                await writes.transition("failed")
                 return False
 
             # Fall back to snippet if scraping failed or got too little text
@@ -267,38 +316,32 @@ async def _process_single_article(article: dict) -> bool:
                 raw_text = article.get("headline", "")
 
             if not raw_text or len(raw_text) < 20:
-                await db.update_article(article_id, {"processing_status": "failed"})
+                await writes.transition("failed")
                 return False
 
-            await db.update_article(article_id, {
-                "raw_content": raw_text,
-                "author": author,
-                "processing_status": "generating",
-            })
+            writes.set(raw_content=raw_text, author=author)
+            await writes.transition("generating")
 
         # Step 2: LLM generate lesson
         result = await llm.generate_lesson(article["headline"], raw_text)
 
         if not result:
-            await db.update_article(article_id, {"processing_status": "failed"})
+            await writes.transition("failed")
             return False
 
         # Save AI content
-        await db.update_article(article_id, {
-            "ai_summary": result.summary,
-            "ai_tutorial": None,
-            "lesson_data": result.model_dump(),
-            "processing_status": "done",
-        })
+        writes.set(ai_summary=result.summary, ai_tutorial=None, lesson_data=result.model_dump())
+        await writes.transition("done")
 
         # Save sectors
+        existing = article.get("article_sectors", [])
+        existing_ids = {s.get("sector_id") for s in existing} if existing else set()
+        new_ids = []
         if result.sectors:
             sectors = await db.get_all_sectors()
             sector_map = {s["slug"]: s["id"] for s in sectors}
             sector_ids = [sector_map[s] for s in result.sectors if s in sector_map]
             if sector_ids:
-                existing = article.get("article_sectors", [])
-                existing_ids = {s.get("sector_id") for s in existing} if existing else set()
                 new_ids = [sid for sid in sector_ids if sid not in existing_ids]
                 if new_ids:
                     await db.insert_article_sectors(article_id, new_ids)
@@ -316,14 +359,17 @@ async def _process_single_article(article: dict) -> bool:
         ]
         await db.insert_quiz(article_id, quiz_rows)
 
-        # Notify users who favorite these sectors
-        await _notify_sector_users(article_id, article["headline"])
+        processed.append({
+            "id": article_id,
+            "headline": article["headline"],
+            "sector_ids": [*existing_ids, *new_ids],
+        })
         return True
 
     except Exception as e:
         print(f"Pipeline error for article {article_id}: {e}")
         try:
-            await db.update_article(article_id, {"processing_status": "failed"})
+            await writes.transition("failed")
         except Exception:
             pass
         return False
@@ -331,12 +377,13 @@ async def _process_single_article(article: dict) -> bool:
 
 async def process_pending_articles(batch_size: int = 10):
     """Scrape and generate AI content for pending articles in parallel."""
-    articles, _ = await db.get_articles(status="pending", page=1, limit=batch_size)
+    articles, _ = await db.get_articles(status="pending", page=1, limit=batch_size, columns=db.ARTICLE_PIPELINE)
     if not articles:
         return
 
+    processed: list[dict] = []
     results = await asyncio.gather(
-        *[_process_single_article(a) for a in articles],
+        *[_process_single_article(a, processed) for a in articles],
         return_exceptions=True,
     )
 
@@ -344,44 +391,10 @@ async def process_pending_articles(batch_size: int = 10):
     failed = len(results) - done
     print(f"Processed {len(articles)} articles: {done} done, {failed} failed")
 
-
-async def _notify_sector_users(article_id: int, headline: str):
-    """Send notifications to users who favorite the article's sectors."""
-    article = await db.get_article_by_id(article_id)
-    if not article:
-        return
-
-    article_sectors = article.get("article_sectors", [])
-    sector_ids = [s["sector_id"] for s in article_sectors]
-    if not sector_ids:
-        return
-
-    # Build sector_id -> name lookup
-    sector_names = {}
-    for s in article_sectors:
-        sec = s.get("sectors")
-        if sec:
-            sector_names[s["sector_id"]] = sec.get("name", "")
-
-    all_favorites = await db.get_all_favorites_with_users()
-
-    # Group by user: collect all matching sector names per user
-    user_sectors: dict[str, list[str]] = {}
-    for fav in all_favorites:
-        if fav["sector_id"] in sector_ids:
-            uid = fav["user_id"]
-            name = sector_names.get(fav["sector_id"], "")
-            if uid not in user_sectors:
-                user_sectors[uid] = []
-            if name:
-                user_sectors[uid].append(name)
-
-    for uid, names in user_sectors.items():
-        sector_label = ", ".join(names[:3]) if names else "your sector"
-        await db.insert_notification(
-            user_id=uid,
-            type="new_article",
-            title=f"New in {sector_label}",
-            body=headline[:200],
-            link=f"/article/{article_id}",
-        )
+    # Notify users who favorite these sectors, once for the whole batch
+    if processed:
+        try:
+            sent = await notify_new_articles(processed)
+            print(f"Sent {sent} new-article notifications")
+        except Exception as e:
+            print(f"Notification fan-out error: {e}")
@@ -1,9 +1,10 @@
 import random
 import logging
-from datetime import date
+from datetime import date, datetime, time, timezone
 
 from app.db import supabase as db
 from app.services import finnhub
+from app.services.leaderboard import leaderboard
 
 logger = logging.getLogger(__name__)
 
@@ -56,44 +57,77 @@ async def get_today_stocks_with_prices() -> list[dict]:
     return stocks
 
 
-async def resolve_pending_predictions():
-    pending = await db.get_pending_predictions()
-    if not pending:
-        logger.info("No pending predictions to resolve")
-        return
+async def _historical_closes(tickers_by_day: dict[str, list[str]]) -> dict[str, dict[str, float]]:
+    """Each past day's closing prices from daily candles: {day: {ticker: close}}.
 
-    # Group by ticker to minimize API calls
-    tickers = list({p["ticker"] for p in pending})
-    closing_prices = {}
-    for ticker in tickers:
+    One candle request per ticker covers every day it is needed for; tickers
+    whose candles can't be fetched are left out and their predictions stay pending.
+    """
+    days_by_ticker: dict[str, set[str]] = {}
+    for day, tickers in tickers_by_day.items():
+        for ticker in tickers:
+            days_by_ticker.setdefault(ticker, set()).add(day)
+
+    closes: dict[str, dict[str, float]] = {day: {} for day in tickers_by_day}
+    for ticker, days in days_by_ticker.items():
+        start = datetime.combine(date.fromisoformat(min(days)), time.min, timezone.utc)
+        end = datetime.combine(date.fromisoformat(max(days)), time.max, timezone.utc)
         try:
-            quote = await finnhub.get_quote(ticker)
-            closing_prices[ticker] = quote.get("c", 0)
+            candles = await finnhub.get_candles(ticker, "D", int(start.timestamp()), int(end.timestamp()))
         except Exception as e:
-            logger.error(f"Failed to fetch closing price for {ticker}: {e}")
-
-    resolved_count = 0
-    for pred in pending:
-        ticker = pred["ticker"]
-        if ticker not in closing_prices or closing_prices[ticker] == 0:
+            logger.error(f"No daily candles for {ticker}: {e}")
             continue
+        for ts, close in zip(candles.get("t", []), candles.get("c", [])):
+            day = datetime.fromtimestamp(ts, timezone.utc).date().isoformat()
+            if day in days and close:
+                closes[day][ticker] = close
+    return closes
+
+
+async def resolve_pending_predictions(trading_date: date | None = None):
+    """Settle every date up to the trading date that still has pending predictions.
+
+    The trading date is settled at its tickers' current quote. Earlier dates
+    (left by a skipped or failed run) are settled at that day's own close from
+    daily candles, never at today's price. Outcomes, results and XP are applied
+    set-based by the settle_predictions RPC, so the predictions never leave the database.
+    """
+    up_to = (trading_date or date.today()).isoformat()
+
+    days = []
+    day = await db.get_next_pending_prediction_date(None, up_to)
+    while day:
+        days.append(day)
+        day = await db.get_next_pending_prediction_date(day, up_to)
+    if not days:
+        logger.info(f"No pending predictions up to {up_to}; nothing to settle")
+        return
 
-        close_price = closing_prices[ticker]
-        bet_price = float(pred["price_at_bet"])
-
-        if pred["direction"] == "up":
-            won = close_price > bet_price
+    tickers_by_day: dict[str, list[str]] = {}
+    for day in days:
+        daily = await db.get_daily_stocks(day)
+        if daily:
+            tickers_by_day[day] = daily["tickers"]
         else:
-            won = close_price < bet_price
-
-        result = "win" if won else "loss"
-        xp = 50 if won else 0
-
-        await db.resolve_prediction(pred["id"], close_price, result, xp)
-
-        if xp > 0:
-            await db.add_xp(pred["user_id"], xp)
-
-        resolved_count += 1
-
-    logger.info(f"Resolved {resolved_count} predictions")
+            logger.error(f"No daily stocks for {day}; its predictions stay pending")
+
+    closes_by_day = await _historical_closes({d: t for d, t in tickers_by_day.items() if d != up_to})
+    if up_to in tickers_by_day:
+        quotes = await finnhub.get_quotes(tickers_by_day[up_to])
+        closes_by_day[up_to] = {ticker: q["c"] for ticker, q in quotes.items() if q.get("c")}
+
+    won_xp: dict[str, int] = {}
+    for day, tickers in tickers_by_day.items():
+        day_closes = closes_by_day.get(day, {})
+        for ticker in set(tickers) - day_closes.keys():
+            logger.error(f"No closing price for {ticker} on {day}; its predictions stay pending until the next run")
+        if not day_closes:
+            continue
+        summary = await db.settle_predictions(day, day_closes)
+        for g in summary.get("grants", []):
+            won_xp[g["user_id"]] = won_xp.get(g["user_id"], 0) + g["amount"]
+        logger.info(
+            f"Resolved {summary['settled']} predictions for {day} "
+            f"({summary['wins']} wins, XP granted to {summary['users_awarded']} users)"
+        )
+    leaderboard.record_xp(won_xp)
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from app.services import finnhub, yahoo
+
+# How long a price loaded over REST is served before reloading; symbols with
+# live trades are refreshed by every trade and stay fresh while the market is open
+QUOTE_TTL_SECONDS = 60
+PREV_CLOSE_TTL_SECONDS = 60 * 60
+MAX_SYMBOLS = 5_000
+# Loads requested within this window share one upstream fetch
+LOAD_BATCH_DELAY_SECONDS = 0.05
+
+
+class QuoteCache:
+    """In-process last-value cache per symbol: last price, its time and the previous close.
+
+    Fed by every trade routed through the Finnhub stream proxy and by quote
+    loads (Finnhub for stocks, Yahoo for ^ indices). Serves the snapshot a
+    stream client gets on subscribe and the /market/quotes endpoint.
+    """
+
+    def __init__(self):
+        # symbol -> {price, ts, prev_close, updated_at, prev_close_at, traded_at}
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._batch: set[str] = set()
+        self._batch_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _entry(self, symbol: str) -> dict:
+        entry = self._entries.get(symbol)
+        if entry is None:
+            entry = self._entries[symbol] = {
+                "price": None, "ts": None, "prev_close": None, "updated_at": 0.0, "prev_close_at": 0.0,
+                "traded_at": None,
+            }
+            if len(self._entries) > MAX_SYMBOLS:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(symbol)
+        return entry
+
+    @staticmethod
+    def _change_pct(price: float | None, prev_close: float | None) -> float | None:
+        if price is None or not prev_close:
+            return None
+        return round((price - prev_close) / prev_close * 100, 4)
+
+    def change_pct(self, symbol: str, price: float) -> float | None:
+        entry = self._entries.get(symbol)
+        return self._change_pct(price, entry["prev_close"] if entry else None)
+
+    def record_trade(self, symbol: str, price: float, ts: int | None):
+        entry = self._entry(symbol)
+        now = time.monotonic()
+        entry["price"], entry["ts"], entry["updated_at"], entry["traded_at"] = price, ts, now, now
+
+    def _store_quote(self, symbol: str, price: float, ts: int | None, prev_close: float | None, now: float):
+        """Store a REST-loaded quote. A live trade seen within QUOTE_TTL_SECONDS (including
+        one that arrived while the load was in flight) is newer, so only the previous close is taken."""
+        entry = self._entry(symbol)
+        entry.update(prev_close=prev_close, prev_close_at=now)
+        traded_at = entry["traded_at"]
+        if traded_at is not None and time.monotonic() - traded_at < QUOTE_TTL_SECONDS:
+            return
+        entry.update(price=price, ts=ts, updated_at=now)
+
+    def _needs_load(self, symbol: str, max_age: float) -> bool:
+        entry = self._entries.get(symbol)
+        if entry is None or entry["price"] is None:
+            return True
+        now = time.monotonic()
+        return now - entry["updated_at"] >= max_age or now - entry["prev_close_at"] >= PREV_CLOSE_TTL_SECONDS
+
+    async def _load(self, symbols: list[str]):
+        self.loads += 1
+        index_symbols = [s for s in symbols if s.startswith("^")]
+        stock_symbols = [s for s in symbols if not s.startswith("^")]
+        now = time.monotonic()
+        try:
+            if index_symbols:
+                for q in await yahoo.fetch_yahoo_quotes(index_symbols):
+                    self._store_quote(q["ticker"], q["price"], int(time.time() * 1000), q["prev_close"], now)
+            if stock_symbols:
+                for symbol, q in (await finnhub.get_quotes(stock_symbols)).items():
+                    if not q.get("c"):
+                        continue  # Finnhub returns zeros for unknown symbols
+                    self._store_quote(symbol, q["c"], (q.get("t") or 0) * 1000 or None, q.get("pc"), now)
+        except Exception as e:
+            print(f"[quote_cache] load failed: {e}")
+
+    async def _load_batch(self):
+        await asyncio.sleep(LOAD_BATCH_DELAY_SECONDS)
+        symbols, self._batch, self._batch_task = self._batch, set(), None
+        try:
+            await self._load(sorted(symbols))
+        finally:
+            for symbol in symbols:
+                future = self._inflight.pop(symbol, None)
+                if future and not future.done():
+                    future.set_result(None)
+
+    def _request(self, symbol: str) -> asyncio.Future:
+        future = self._inflight.get(symbol)
+        if future is None:
+            future = self._inflight[symbol] = asyncio.get_running_loop().create_future()
+            self._batch.add(symbol)
+            if self._batch_task is None:
+                self._batch_task = asyncio.create_task(self._load_batch())
+        return future
+
+    async def ensure(self, symbols: list[str], max_age: float = QUOTE_TTL_SECONDS):
+        """Load symbols that are missing or older than max_age (or whose previous close is stale)."""
+        stale = [s for s in symbols if self._needs_load(s, max_age)]
+        self.misses += len(stale)
+        self.hits += len(symbols) - len(stale)
+        if stale:
+            await asyncio.gather(*(self._request(s) for s in stale))
+
+    def snapshot(self, symbols) -> list[dict]:
+        """Stream-format entries ({s, p, t, dp}) for the symbols that have a price."""
+        out = []
+        for symbol in symbols:
+            entry = self._entries.get(symbol)
+            if entry and entry["price"] is not None:
+                out.append({
+                    "s": symbol, "p": entry["price"], "t": entry["ts"],
+                    "dp": self._change_pct(entry["price"], entry["prev_close"]),
+                })
+        return out
+
+    async def quotes(self, symbols: list[str]) -> list[dict]:
+        """REST-format quotes ({ticker, price, price_change_pct}), loading only what isn't fresh."""
+        await self.ensure(symbols)
+        return [
+            {"ticker": e["s"], "price": e["p"], "price_change_pct": e["dp"]}
+            for e in self.snapshot(symbols)
+        ]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "symbols": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "upstream_loads": self.loads,
+        }
+
+
+quote_cache = QuoteCache()
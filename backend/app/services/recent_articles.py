@@ -0,0 +1,166 @@
+import hashlib
+import math
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from app.db import supabase as db
+
+# Keys that identify an article (matches the DB dedup columns)
+DEDUP_KEYS = ("finnhub_id", "gnews_url", "original_url")
+
+WINDOW_DAYS = 7
+LRU_MAX_ENTRIES = 50_000
+BLOOM_CAPACITY = 200_000
+BLOOM_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on a blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class RecentArticleIndex:
+    """In-process index of recently ingested article keys, used to skip dedup queries.
+
+    An exact LRU set rejects known duplicates outright. Two rotating Bloom
+    generations cover at least WINDOW_DAYS of inserts (warm-up loads stored
+    articles by published_at, the same field the window check uses), so a
+    candidate published inside the window whose keys are all absent from the
+    filter is treated as new and skips the dedup query too. Everything else
+    falls through to db.filter_new_articles. A story re-dated upstream can
+    still match an older stored copy; db.insert_articles skips those rows
+    instead of failing the batch. Assumes this process sees every insert,
+    i.e. a single backend instance.
+    """
+
+    def __init__(self):
+        self._lru: OrderedDict[str, None] = OrderedDict()
+        self._current = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        self._previous = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        self._rotated_at = datetime.now(timezone.utc)
+        self.warm = False
+        self.hits = 0
+        self.misses = 0
+        self.skipped_lookups = 0
+
+    @staticmethod
+    def _keys(row: dict) -> list[str]:
+        return [f"{k}:{row[k]}" for k in DEDUP_KEYS if row.get(k)]
+
+    def _maybe_rotate(self):
+        now = datetime.now(timezone.utc)
+        if now - self._rotated_at >= timedelta(days=WINDOW_DAYS):
+            self._previous = self._current
+            self._current = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+            self._rotated_at = now
+
+    def _remember(self, key: str):
+        self._lru[key] = None
+        self._lru.move_to_end(key)
+        if len(self._lru) > LRU_MAX_ENTRIES:
+            self._lru.popitem(last=False)
+        self._current.add(key)
+
+    def add(self, rows: list[dict]):
+        """Record rows that now exist in the articles table."""
+        self._maybe_rotate()
+        for row in rows:
+            for key in self._keys(row):
+                self._remember(key)
+
+    def _in_window(self, published_at: str | None) -> bool:
+        if not published_at:
+            return False
+        try:
+            published = datetime.fromisoformat(published_at)
+        except (TypeError, ValueError):
+            return False
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return published >= datetime.now(timezone.utc) - timedelta(days=WINDOW_DAYS)
+
+    def partition(self, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Split rows into (definitely new, needs a DB check), dropping known duplicates.
+
+        Duplicates within the batch are dropped here as well.
+        """
+        self._maybe_rotate()
+        seen: set[str] = set()
+        fresh, unsure = [], []
+        for row in rows:
+            keys = self._keys(row)
+            if any(k in seen for k in keys):
+                continue
+            seen.update(keys)
+
+            if any(k in self._lru for k in keys):
+                for k in keys:
+                    if k in self._lru:
+                        self._lru.move_to_end(k)
+                self.hits += 1
+                continue
+            self.misses += 1
+
+            if (
+                self.warm
+                and self._in_window(row.get("published_at"))
+                and not any(k in self._current or k in self._previous for k in keys)
+            ):
+                self.skipped_lookups += 1
+                fresh.append(row)
+            else:
+                unsure.append(row)
+        return fresh, unsure
+
+    async def warm_up(self):
+        """Load keys of articles published within the window from the database.
+
+        This must use the same field as the partition() window check: a
+        Bloom-negative row may only skip the DB check if every stored article
+        that could share its keys was loaded here.
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=WINDOW_DAYS)).isoformat()
+        count = 0
+        async for page in db.iter_recent_article_keys(since):
+            self.add(page)
+            count += len(page)
+        self.warm = True
+        print(f"[recent_articles] warmed with {count} articles from the last {WINDOW_DAYS} days")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "warm": self.warm,
+            "entries": len(self._lru),
+            "max_entries": LRU_MAX_ENTRIES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "skipped_lookups": self.skipped_lookups,
+            "bloom_bytes": self._current.size_bytes + self._previous.size_bytes,
+        }
+
+
+recent_articles = RecentArticleIndex()
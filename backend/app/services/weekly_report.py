@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from app.db import supabase as db
 from app.services.email import send_weekly_report_email
 from app.services.llm import generate_sector_weekly_summary, generate_revision_questions
+from app.services.notifications import send_notification
 
 
 async def generate_weekly_report(user_id: str, week_start: datetime, week_end: datetime) -> dict | None:
@@ -156,7 +157,7 @@ async def generate_all_weekly_reports():
             if report:
                 print(f"[weekly_report] generated report #{report['id']} for user {user_id}")
                 # Send notification
-                await db.insert_notification(
+                await send_notification(
                     user_id=user_id,
                     type="weekly_report",
                     title="Your Weekly Report is Ready",
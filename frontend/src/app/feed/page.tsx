@@ -11,31 +11,32 @@ import type { Article } from "@/types";
 export default function FeedPage() {
   const { user, session, loading: authLoading } = useAuth();
   const [articles, setArticles] = useState<Article[]>([]);
-  const [page, setPage] = useState(1);
-  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
-  const fetchFeed = async (p: number) => {
+  const fetchFeed = async (cursor: string | null) => {
     if (!session) return;
-    const res = await apiFetch<Article[]>(`/articles/feed?page=${p}&limit=20`, {
+    const params = new URLSearchParams({ limit: "20" });
+    if (cursor) params.set("cursor", cursor);
+    const res = await apiFetch<Article[]>(`/articles/feed?${params}`, {
       token: session.access_token,
     });
     if (res.success && res.data) {
-      if (p === 1) {
+      if (!cursor) {
         setArticles(res.data);
       } else {
         setArticles((prev) => [...prev, ...res.data!]);
       }
-      setTotal((res.meta?.total as number) ?? 0);
+      setNextCursor((res.meta?.next_cursor as string | null) ?? null);
     }
     setLoading(false);
   };
 
   useEffect(() => {
     if (!session) return;
-    setPage(1);
+    setNextCursor(null);
     setLoading(true);
-    fetchFeed(1);
+    fetchFeed(null);
   }, [session]);
 
   if (authLoading) {
@@ -110,13 +111,9 @@ export default function FeedPage() {
             <ArticleCard article={article} />
           </StaggerItem>
         ))}
-        {articles.length < total && (
+        {nextCursor && (
           <button
-            onClick={() => {
-              const next = page + 1;
-              setPage(next);
-              fetchFeed(next);
-            }}
+            onClick={() => fetchFeed(nextCursor)}
             className="w-full py-3 text-sm text-teal-400 hover:text-teal-300 border border-gray-800 rounded-lg hover:bg-gray-900/50 transition-colors"
           >
             Load more
@@ -11,38 +11,36 @@ interface ArticleListProps {
 
 export default function ArticleList({ sector, category }: ArticleListProps) {
   const [articles, setArticles] = useState<Article[]>([]);
-  const [page, setPage] = useState(1);
-  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
-  const fetchArticles = async (p: number) => {
-    const params = new URLSearchParams({ page: String(p), limit: "20" });
+  const fetchArticles = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: "20" });
+    if (cursor) params.set("cursor", cursor);
     if (sector) params.set("sector", sector);
     if (category) params.set("category", category);
 
     const res = await fetch(`/api/v1/articles?${params}`);
     const data = await res.json();
     if (data.success) {
-      if (p === 1) {
+      if (!cursor) {
         setArticles(data.data);
       } else {
         setArticles((prev) => [...prev, ...data.data]);
       }
-      setTotal(data.meta?.total ?? 0);
+      setNextCursor(data.meta?.next_cursor ?? null);
     }
     setLoading(false);
   };
 
   useEffect(() => {
-    setPage(1);
+    setNextCursor(null);
     setLoading(true);
-    fetchArticles(1);
+    fetchArticles(null);
   }, [sector, category]);
 
   const loadMore = () => {
-    const next = page + 1;
-    setPage(next);
-    fetchArticles(next);
+    if (nextCursor) fetchArticles(nextCursor);
   };
 
   if (loading) {
@@ -66,7 +64,7 @@ export default function ArticleList({ sector, category }: ArticleListProps) {
       {articles.map((article) => (
         <ArticleCard key={article.id} article={article} />
       ))}
-      {articles.length < total && (
+      {nextCursor && (
         <button
           onClick={loadMore}
           className="w-full py-3 text-sm text-teal-400 hover:text-teal-300 border border-gray-800 rounded-lg hover:bg-gray-900/50 transition-colors"
@@ -1,54 +1,93 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { createClient } from "@/lib/supabase/client";
 import { useAuth } from "./useAuth";
 import type { Notification } from "@/types";
 
+function getWsUrl(): string {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+  const wsProtocol = apiUrl.startsWith("https") ? "wss" : "ws";
+  const host = apiUrl.replace(/^https?:\/\//, "");
+  return `${wsProtocol}://${host}/api/v1/notifications/ws`;
+}
+
 export function useNotifications() {
   const { user, session } = useAuth();
   const [notifications, setNotifications] = useState<Notification[]>([]);
   const [unreadCount, setUnreadCount] = useState(0);
-  const supabase = createClient();
 
   useEffect(() => {
     if (!user || !session?.access_token) return;
+    const token = session.access_token;
 
     // Initial fetch
     fetch(`/api/v1/notifications`, {
-      headers: { Authorization: `Bearer ${session.access_token}` },
+      headers: { Authorization: `Bearer ${token}` },
     })
       .then((r) => r.text())
       .then((text) => (text ? JSON.parse(text) : null))
       .then((data) => {
         if (!data) return;
-        if (data.success) {
-          setNotifications(data.data);
-          setUnreadCount(data.data.filter((n: Notification) => !n.read).length);
-        }
+        if (data.success) setNotifications(data.data);
+      });
+    fetch(`/api/v1/notifications/unread-count`, {
+      headers: { Authorization: `Bearer ${token}` },
+    })
+      .then((r) => r.text())
+      .then((text) => (text ? JSON.parse(text) : null))
+      .then((data) => {
+        if (data?.success) setUnreadCount(data.data.unread_count);
       });
 
-    // Real-time subscription
-    const channel = supabase
-      .channel("notifications")
-      .on(
-        "postgres_changes",
-        {
-          event: "INSERT",
-          schema: "public",
-          table: "notifications",
-          filter: `user_id=eq.${user.id}`,
-        },
-        (payload) => {
-          const newNotif = payload.new as Notification;
-          setNotifications((prev) => [newNotif, ...prev]);
-          setUnreadCount((prev) => prev + 1);
+    // Coalesced push from the backend: newest rows + authoritative unread count
+    let ws: WebSocket | null = null;
+    let retries = 0;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const connect = () => {
+      try {
+        ws = new WebSocket(getWsUrl());
+      } catch {
+        return; // invalid URL or blocked — skip silently
+      }
+
+      ws.onopen = () => {
+        retries = 0;
+        ws?.send(JSON.stringify({ type: "auth", token }));
+      };
+
+      ws.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (data.type !== "notifications") return;
+          const latest = (data.latest || []) as Notification[];
+          setNotifications((prev) => {
+            const seen = new Set(prev.map((n) => n.id));
+            return [...latest.filter((n) => !seen.has(n.id)), ...prev];
+          });
+          setUnreadCount(data.unread_count);
+        } catch {
+          // malformed message — ignore
         }
-      )
-      .subscribe();
+      };
+
+      ws.onclose = () => {
+        // Reconnect with exponential backoff, max 60s, max 5 retries
+        if (!closed && retries < 5) {
+          const delay = Math.min(2000 * 2 ** retries, 60000);
+          retries++;
+          timer = setTimeout(connect, delay);
+        }
+      };
+    };
+
+    connect();
 
     return () => {
-      supabase.removeChannel(channel);
+      closed = true;
+      if (timer) clearTimeout(timer);
+      ws?.close();
     };
   }, [user, session]);
 
@@ -8,11 +8,17 @@ interface TickerData {
   change: number;
 }
 
+const CONFLATE_HZ = 2;
+// The WebSocket sends a snapshot on subscribe; REST only backstops symbols
+// without live trades (indices), and is served from the backend's quote cache
+const QUOTES_REFRESH_MS = 5 * 60_000;
+
 function getWsUrl(): string {
   const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
   const wsProtocol = apiUrl.startsWith("https") ? "wss" : "ws";
   const host = apiUrl.replace(/^https?:\/\//, "");
-  return `${wsProtocol}://${host}/api/v1/market/ws`;
+  // The ticker bar only shows last price, so take conflated batches rather than every trade
+  return `${wsProtocol}://${host}/api/v1/market/ws?conflate_hz=${CONFLATE_HZ}`;
 }
 
 export function useTickerStream(symbols: string[]) {
@@ -21,7 +27,7 @@ export function useTickerStream(symbols: string[]) {
   const retryRef = useRef(0);
   const timerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
-  // Fetch prices via backend proxy, refresh every 60s
+  // Fetch prices via backend proxy, refresh every few minutes
   useEffect(() => {
     async function fetchQuotes() {
       try {
@@ -40,7 +46,7 @@ export function useTickerStream(symbols: string[]) {
               };
             }
           }
-          setTickers(updated);
+          setTickers((prev) => ({ ...prev, ...updated }));
         }
       } catch {
         // REST quotes unavailable — ticker bar shows loading state
@@ -48,7 +54,7 @@ export function useTickerStream(symbols: string[]) {
     }
 
     fetchQuotes();
-    const interval = setInterval(fetchQuotes, 60_000);
+    const interval = setInterval(fetchQuotes, QUOTES_REFRESH_MS);
     return () => clearInterval(interval);
   }, []);
 
@@ -74,22 +80,19 @@ export function useTickerStream(symbols: string[]) {
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
-        if (data.type === "trade" && data.data) {
-          for (const trade of data.data) {
-            setTickers((prev) => {
-              const existing = prev[trade.s];
-              return {
-                ...prev,
-                [trade.s]: {
-                  symbol: trade.s,
-                  price: trade.p,
-                  change: existing
-                    ? ((trade.p - existing.price) / existing.price) * 100
-                    : 0,
-                },
+        if ((data.type === "trade" || data.type === "snapshot") && data.data) {
+          // dp is the day change vs. previous close, computed by the backend
+          setTickers((prev) => {
+            const next = { ...prev };
+            for (const trade of data.data) {
+              next[trade.s] = {
+                symbol: trade.s,
+                price: trade.p,
+                change: trade.dp ?? prev[trade.s]?.change ?? 0,
               };
-            });
-          }
+            }
+            return next;
+          });
         }
       } catch {
         // malformed message — ignore